@@ -1,19 +1,106 @@
 """
 Redis client configuration for job queue
 """
+import asyncio
+import msgspec
+import orjson
 import redis
-from rq import Queue
+import redis.asyncio as aioredis
 from config.settings import settings
+from models.schemas import ProgressUpdate
 import logging
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 
-# Redis connection
-redis_conn = redis.from_url(settings.REDIS_URL, decode_responses=True)
+# Bounded connection pool for the sync client. The default
+# pool creates unbounded sockets under load; BlockingConnectionPool makes
+# callers wait for a free connection instead of exhausting FDs. Response
+# parsing uses the hiredis C parser automatically when hiredis is installed.
+REDIS_MAX_CONNECTIONS = 64
 
-# Job queue for background processing
-job_queue = Queue("scope_processing", connection=redis_conn)
+redis_pool = redis.BlockingConnectionPool.from_url(
+    settings.REDIS_URL,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    decode_responses=True
+)
+
+# Redis connection (sync, used by workers and worker-side helpers)
+redis_conn = redis.Redis(connection_pool=redis_pool)
+
+# Async Redis connection for publishing from the event loop.
+# No decode_responses here: payloads are published as raw orjson bytes.
+redis_async = aioredis.from_url(settings.REDIS_URL)
+
+class JobStream:
+    """
+    Job queue backed by a Redis Stream with a consumer group
+
+    Replaces the former RQ queue: XREADGROUP lets workers pull jobs in
+    batches (one round-trip per batch instead of per job), XACK gives
+    at-least-once delivery, and XLEN/XPENDING expose backpressure that
+    RQ never surfaced.
+    """
+
+    def __init__(self, stream: str, group: str = "workers", connection: Optional[redis.Redis] = None):
+        self.stream = stream
+        self.group = group
+        self.conn = connection or redis_conn
+
+    def ensure_group(self):
+        """Create the consumer group if it does not exist yet"""
+        try:
+            self.conn.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def enqueue(self, job: dict) -> str:
+        """Add a job to the stream, returning its message id"""
+        return self.conn.xadd(self.stream, {"payload": orjson.dumps(job)})
+
+    def read_batch(self, consumer: str, count: int = 16, block_ms: int = 1000) -> List[Tuple[str, Dict]]:
+        """
+        Read up to `count` pending jobs for a consumer, blocking up to
+        `block_ms` milliseconds when the stream is empty
+
+        Returns:
+            List of (message_id, job) tuples
+        """
+        resp = self.conn.xreadgroup(
+            self.group, consumer, {self.stream: ">"}, count=count, block=block_ms
+        )
+        jobs = []
+        for _, messages in resp or []:
+            for msg_id, fields in messages:
+                jobs.append((msg_id, orjson.loads(fields["payload"])))
+        return jobs
+
+    def ack_batch(self, msg_ids: List[str]):
+        """Acknowledge a batch of processed jobs in one pipelined round-trip"""
+        if not msg_ids:
+            return
+        with self.conn.pipeline(transaction=False) as pipe:
+            for msg_id in msg_ids:
+                pipe.xack(self.stream, self.group, msg_id)
+            pipe.execute()
+
+    def depth(self) -> int:
+        """Number of entries in the stream (backpressure metric)"""
+        return self.conn.xlen(self.stream)
+
+
+# Job stream for background processing
+job_stream = JobStream("scope_processing")
+
+# Progress publishes are coalesced into pipelined batches by a background task
+# so bursty updates cost one round-trip per window instead of one per call
+PROGRESS_MAX_BATCH = 256
+PROGRESS_MAX_DELAY_MS = 25
+
+_progress_queue: "asyncio.Queue[Tuple[str, bytes]]" = asyncio.Queue()
+_publisher_task: Optional[asyncio.Task] = None
 
 
 def get_redis():
@@ -21,15 +108,19 @@ def get_redis():
     return redis_conn
 
 
-def get_job_queue():
-    """Get RQ job queue"""
-    return job_queue
+def get_job_stream():
+    """Get the scope-processing job stream"""
+    return job_stream
 
 
-def publish_progress(session_id: str, progress: int, message: str):
+async def publish_progress(session_id: str, progress: int, message: str):
     """
     Publish progress update to Redis pub/sub channel
 
+    Updates are queued and flushed in pipelined batches by the background
+    publisher task (see start_progress_publisher), so this never blocks
+    the event loop on a Redis round-trip.
+
     Args:
         session_id: Unique session/job identifier
         progress: Progress percentage (0-100)
@@ -37,13 +128,58 @@ def publish_progress(session_id: str, progress: int, message: str):
     """
     try:
         channel = f"progress:{session_id}"
-        data = {
-            "type": "progress",
-            "pct": progress,
-            "msg": message
-        }
-        redis_conn.publish(channel, str(data))
-        logger.debug(f"Published progress: {session_id} - {progress}% - {message}")
+        payload = msgspec.json.encode(ProgressUpdate(pct=progress, msg=message))
+        await _progress_queue.put((channel, payload))
+        logger.debug("Queued progress: %s - %d%% - %s", session_id, progress, message)
 
     except Exception as e:
-        logger.error(f"Error publishing progress: {e}")
+        logger.error("Error publishing progress: %s", e)
+
+
+async def _drain_progress_queue():
+    """Flush queued progress updates as a single pipelined PUBLISH batch"""
+    loop = asyncio.get_running_loop()
+
+    while True:
+        # Block until at least one update is pending
+        batch = [await _progress_queue.get()]
+
+        # Coalesce anything else that arrives within the batching window
+        deadline = loop.time() + PROGRESS_MAX_DELAY_MS / 1000
+        while len(batch) < PROGRESS_MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_progress_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            async with redis_async.pipeline(transaction=False) as pipe:
+                for channel, payload in batch:
+                    pipe.publish(channel, payload)
+                await pipe.execute()
+
+        except Exception as e:
+            logger.error("Error publishing progress batch: %s", e)
+
+
+def start_progress_publisher():
+    """Start the background task that flushes batched progress publishes"""
+    global _publisher_task
+    if _publisher_task is None or _publisher_task.done():
+        _publisher_task = asyncio.create_task(_drain_progress_queue())
+        logger.info("Progress publisher task started")
+
+
+async def stop_progress_publisher():
+    """Cancel the background publisher task on shutdown"""
+    global _publisher_task
+    if _publisher_task is not None:
+        _publisher_task.cancel()
+        try:
+            await _publisher_task
+        except asyncio.CancelledError:
+            pass
+        _publisher_task = None
@@ -1,6 +1,7 @@
 """
 Application settings and environment variables
 """
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -25,12 +26,18 @@ class Settings(BaseSettings):
     APP_VERSION: str = "2.0.0"
     DEBUG: bool = False
 
+    # CORS - explicit origins let the middleware precompute its headers
+    # instead of echoing the Origin header on every request
+    ALLOWED_ORIGINS: list[str] = ["http://localhost:3000", "http://localhost:8501"]
+
     # File Upload
+    # frozensets so the per-upload `mime in settings.ALLOWED_*` check is a
+    # hashed lookup instead of a list scan
     MAX_FILE_SIZE_MB: int = 500
-    ALLOWED_VIDEO_TYPES: list[str] = ["video/mp4", "video/quicktime", "video/webm", "video/x-msvideo"]
-    ALLOWED_AUDIO_TYPES: list[str] = ["audio/mpeg", "audio/mp4", "audio/wav", "audio/x-wav", "audio/flac", "audio/ogg"]
-    ALLOWED_IMAGE_TYPES: list[str] = ["image/jpeg", "image/png", "image/heic", "image/heif"]
-    ALLOWED_TEXT_TYPES: list[str] = ["text/plain", "application/pdf", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
+    ALLOWED_VIDEO_TYPES: frozenset[str] = frozenset({"video/mp4", "video/quicktime", "video/webm", "video/x-msvideo"})
+    ALLOWED_AUDIO_TYPES: frozenset[str] = frozenset({"audio/mpeg", "audio/mp4", "audio/wav", "audio/x-wav", "audio/flac", "audio/ogg"})
+    ALLOWED_IMAGE_TYPES: frozenset[str] = frozenset({"image/jpeg", "image/png", "image/heic", "image/heif"})
+    ALLOWED_TEXT_TYPES: frozenset[str] = frozenset({"text/plain", "application/pdf", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"})
 
     # AI Configuration
     CLAUDE_MODEL: str = "claude-3-5-sonnet-20241022"
@@ -39,11 +46,23 @@ class Settings(BaseSettings):
 
     # Processing
     ASSEMBLYAI_WEBHOOK_URL: Optional[str] = None
+    AAI_MAX_CONCURRENCY: int = 32  # AssemblyAI account concurrency cap
 
     class Config:
         env_file = ".env"
         case_sensitive = True
 
 
-# Global settings instance
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide Settings instance.
+
+    Cached so the .env file is read and validated exactly once per
+    process, even when modules are re-imported (tests, RQ worker forks).
+    Also usable as a FastAPI dependency via Depends(get_settings).
+    """
+    return Settings()
+
+
+# Global settings instance (shared alias for the cached instance)
+settings = get_settings()
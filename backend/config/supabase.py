@@ -3,12 +3,29 @@ Supabase client configuration and helpers
 """
 from supabase import create_client, Client
 from config.settings import settings
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Tuple, Union
+import asyncio
+import httpx
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Shared async HTTP client for Storage operations. One client per process
+# keeps TLS sessions alive (HTTP/2 multiplexing, keep-alive pool) instead of
+# paying a handshake per upload/download through the sync supabase-py client.
+_storage_http = httpx.AsyncClient(
+    http2=True,
+    timeout=30.0,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+)
+
+
+async def close_storage_client():
+    """Close the shared Storage HTTP client (call on application shutdown)"""
+    await _storage_http.aclose()
+
+
 class SupabaseClient:
     """Supabase client wrapper with helper methods"""
 
@@ -23,42 +40,62 @@ class SupabaseClient:
         key = settings.SUPABASE_SERVICE_KEY if use_service_key else settings.SUPABASE_KEY
         self.client: Client = create_client(settings.SUPABASE_URL, key)
         self.use_service_key = use_service_key
+        self._storage_headers = {
+            "apikey": key,
+            "Authorization": f"Bearer {key}"
+        }
 
     def get_client(self) -> Client:
         """Get the underlying Supabase client"""
         return self.client
 
+    def _storage_url(self, bucket: str, file_path: str) -> str:
+        """Build the Storage REST URL for an object"""
+        return f"{settings.SUPABASE_URL}/storage/v1/object/{bucket}/{file_path}"
+
     async def upload_file(
         self,
         bucket: str,
         file_path: str,
-        file_data: bytes,
-        content_type: Optional[str] = None
+        file_data: Union[bytes, AsyncIterator[bytes]],
+        content_type: Optional[str] = None,
+        content_length: Optional[int] = None
     ) -> dict:
         """
         Upload a file to Supabase Storage
 
+        Accepts either the full content as bytes or an async iterator of
+        chunks (e.g. request.stream()). Streaming keeps memory at
+        O(chunk_size) instead of buffering a whole video in RAM.
+
         Args:
             bucket: Storage bucket name (e.g., 'uploads', 'documents', 'logos')
             file_path: Path within bucket (e.g., 'client_id/project_id/file.mp4')
-            file_data: File content as bytes
+            file_data: File content as bytes or an async iterator of chunks
             content_type: MIME type of the file
+            content_length: Total size in bytes (required when streaming)
 
         Returns:
             dict with 'path' and 'url' of uploaded file
         """
         try:
-            # Upload file
-            response = self.client.storage.from_(bucket).upload(
-                file_path,
-                file_data,
-                file_options={"content-type": content_type} if content_type else None
+            headers = dict(self._storage_headers)
+            if content_type:
+                headers["Content-Type"] = content_type
+            if content_length is not None:
+                headers["Content-Length"] = str(content_length)
+
+            response = await _storage_http.post(
+                self._storage_url(bucket, file_path),
+                content=file_data,
+                headers=headers
             )
+            response.raise_for_status()
 
-            # Get public URL
-            public_url = self.client.storage.from_(bucket).get_public_url(file_path)
+            # Public URL (no request needed - it is deterministic)
+            public_url = f"{settings.SUPABASE_URL}/storage/v1/object/public/{bucket}/{file_path}"
 
-            logger.info(f"File uploaded successfully: {bucket}/{file_path}")
+            logger.info("File uploaded successfully: %s/%s", bucket, file_path)
 
             return {
                 "path": file_path,
@@ -66,7 +103,7 @@ class SupabaseClient:
             }
 
         except Exception as e:
-            logger.error(f"Error uploading file to Supabase Storage: {e}")
+            logger.error("Error uploading file to Supabase Storage: %s", e)
             raise
 
     async def download_file(self, bucket: str, file_path: str) -> bytes:
@@ -81,12 +118,16 @@ class SupabaseClient:
             File content as bytes
         """
         try:
-            response = self.client.storage.from_(bucket).download(file_path)
-            logger.info(f"File downloaded successfully: {bucket}/{file_path}")
-            return response
+            response = await _storage_http.get(
+                self._storage_url(bucket, file_path),
+                headers=self._storage_headers
+            )
+            response.raise_for_status()
+            logger.info("File downloaded successfully: %s/%s", bucket, file_path)
+            return response.content
 
         except Exception as e:
-            logger.error(f"Error downloading file from Supabase Storage: {e}")
+            logger.error("Error downloading file from Supabase Storage: %s", e)
             raise
 
     async def delete_file(self, bucket: str, file_path: str) -> bool:
@@ -101,28 +142,125 @@ class SupabaseClient:
             True if successful
         """
         try:
-            self.client.storage.from_(bucket).remove([file_path])
-            logger.info(f"File deleted successfully: {bucket}/{file_path}")
+            response = await _storage_http.delete(
+                self._storage_url(bucket, file_path),
+                headers=self._storage_headers
+            )
+            response.raise_for_status()
+            logger.info("File deleted successfully: %s/%s", bucket, file_path)
+            return True
+
+        except Exception as e:
+            logger.error("Error deleting file from Supabase Storage: %s", e)
+            raise
+
+    async def upload_many(
+        self,
+        bucket: str,
+        items: List[Tuple[str, bytes, Optional[str]]],
+        max_concurrency: int = 16
+    ) -> List[dict]:
+        """
+        Upload multiple files concurrently to Supabase Storage
+
+        Args:
+            bucket: Storage bucket name
+            items: List of (file_path, file_data, content_type) tuples
+            max_concurrency: Maximum number of uploads in flight at once
+
+        Returns:
+            List of upload results in the same order as items
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def upload_one(file_path, file_data, content_type):
+            async with sem:
+                return await self.upload_file(bucket, file_path, file_data, content_type)
+
+        return list(await asyncio.gather(*(upload_one(*item) for item in items)))
+
+    async def download_many(
+        self,
+        bucket: str,
+        file_paths: List[str],
+        max_concurrency: int = 16
+    ) -> List[bytes]:
+        """
+        Download multiple files concurrently from Supabase Storage
+
+        Args:
+            bucket: Storage bucket name
+            file_paths: List of paths within the bucket
+            max_concurrency: Maximum number of downloads in flight at once
+
+        Returns:
+            List of file contents in the same order as file_paths
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def download_one(file_path):
+            async with sem:
+                return await self.download_file(bucket, file_path)
+
+        return list(await asyncio.gather(*(download_one(p) for p in file_paths)))
+
+    async def delete_many(self, bucket: str, file_paths: List[str]) -> bool:
+        """
+        Delete multiple files from Supabase Storage in a single request
+
+        The Storage API accepts a batch delete, so this costs one round-trip
+        regardless of how many paths are passed.
+
+        Args:
+            bucket: Storage bucket name
+            file_paths: List of paths within the bucket
+
+        Returns:
+            True if successful
+        """
+        try:
+            response = await _storage_http.request(
+                "DELETE",
+                f"{settings.SUPABASE_URL}/storage/v1/object/{bucket}",
+                json={"prefixes": file_paths},
+                headers=self._storage_headers
+            )
+            response.raise_for_status()
+            logger.info("Deleted %d files from %s", len(file_paths), bucket)
             return True
 
         except Exception as e:
-            logger.error(f"Error deleting file from Supabase Storage: {e}")
+            logger.error("Error batch-deleting files from Supabase Storage: %s", e)
             raise
 
 
-# Global instances
-# Use anon key for client-side operations (respects RLS)
-supabase_client = SupabaseClient(use_service_key=False)
+# Global instances, created lazily on first access. create_client builds
+# GoTrue, PostgREST, Storage and Realtime sub-clients, so worker processes
+# that only ever touch one of the two (usually admin) skip the other's setup.
+_anon_client: Optional[SupabaseClient] = None
+_admin_client: Optional[SupabaseClient] = None
+
 
-# Use service key for admin operations (bypasses RLS)
-supabase_admin = SupabaseClient(use_service_key=True)
+def __getattr__(name: str):
+    global _anon_client, _admin_client
+    if name == "supabase_client":
+        if _anon_client is None:
+            # Anon key for client-side operations (respects RLS)
+            _anon_client = SupabaseClient(use_service_key=False)
+        return _anon_client
+    if name == "supabase_admin":
+        if _admin_client is None:
+            # Service key for admin operations (bypasses RLS)
+            _admin_client = SupabaseClient(use_service_key=True)
+        return _admin_client
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_supabase() -> Client:
     """Get Supabase client (respects RLS)"""
-    return supabase_client.get_client()
+    return __getattr__("supabase_client").get_client()
 
 
 def get_supabase_admin() -> Client:
     """Get Supabase admin client (bypasses RLS)"""
-    return supabase_admin.get_client()
+    return __getattr__("supabase_admin").get_client()
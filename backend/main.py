@@ -2,12 +2,14 @@
 Main FastAPI application for GC Video Scope Analyzer
 Multi-tenant SaaS version
 """
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from config.settings import settings
 from config.supabase import get_supabase, get_supabase_admin
-from models.schemas import SuccessResponse, ErrorResponse
+from models.schemas import SuccessResponse
+import asyncio
 import logging
 
 # Configure logging
@@ -15,19 +17,76 @@ logging.basicConfig(
     level=logging.DEBUG if settings.DEBUG else logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+# Skip per-record metadata we never put in the format string (caller lookup,
+# thread/process ids) - it is collected eagerly for every log call otherwise
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
 logger = logging.getLogger(__name__)
 
+
+# =====================================================
+# LIFESPAN (STARTUP & SHUTDOWN)
+# =====================================================
+
+async def _probe_supabase():
+    """Verify the Supabase client initializes"""
+    get_supabase()
+    logger.info("✓ Supabase connection established")
+
+
+async def _probe_redis():
+    """Verify Redis is reachable without blocking the event loop"""
+    from config.redis_client import get_redis
+    await asyncio.to_thread(get_redis().ping)
+    logger.info("✓ Redis connection established")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown lifecycle"""
+    logger.info("Starting %s v%s", settings.APP_NAME, settings.APP_VERSION)
+    logger.info("Debug mode: %s", settings.DEBUG)
+
+    from config.redis_client import start_progress_publisher, stop_progress_publisher
+    from config.supabase import close_storage_client
+    from services.parsing import close_parsing_client
+    from services.transcription import close_transcription_client
+    from services.vision import close_vision_client
+
+    # Probe connections concurrently - each costs a network round-trip
+    try:
+        await asyncio.gather(_probe_supabase(), _probe_redis())
+    except Exception as e:
+        logger.error("✗ Startup connection test failed: %s", e)
+
+    # Start the batched progress publisher
+    start_progress_publisher()
+
+    yield
+
+    await stop_progress_publisher()
+    await close_storage_client()
+    await close_parsing_client()
+    await close_transcription_client()
+    await close_vision_client()
+    logger.info("Shutting down %s", settings.APP_NAME)
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
-    description="Multi-tenant scope analysis SaaS for general contractors"
+    description="Multi-tenant scope analysis SaaS for general contractors",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# CORS middleware
+# CORS middleware - explicit origin list from settings so the middleware
+# serves precomputed headers instead of echoing origins per request
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # TODO: Restrict in production
+    allow_origins=settings.ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -64,8 +123,8 @@ async def health_check():
             "database": "connected"
         }
     except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        return JSONResponse(
+        logger.error("Health check failed: %s", e)
+        return ORJSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             content={
                 "status": "unhealthy",
@@ -74,6 +133,26 @@ async def health_check():
         )
 
 
+# =====================================================
+# WEBHOOKS
+# =====================================================
+
+@app.post("/api/webhooks/assemblyai")
+async def assemblyai_webhook(payload: dict):
+    """Resolve a pending transcription when AssemblyAI calls back"""
+    from services.transcription import transcription_service
+
+    transcript_id = payload.get("transcript_id")
+    if not transcript_id:
+        raise HTTPException(status_code=400, detail="Missing transcript_id")
+
+    transcription_service.resolve_webhook(
+        transcript_id,
+        payload.get("status", "completed")
+    )
+    return {"success": True}
+
+
 # =====================================================
 # IMPORT ROUTES
 # =====================================================
@@ -97,59 +176,30 @@ async def health_check():
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Handle HTTP exceptions"""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
-        content=ErrorResponse(
-            error=exc.detail,
-            details={"status_code": exc.status_code}
-        ).dict()
+        content={
+            "success": False,
+            "error": exc.detail,
+            "details": {"status_code": exc.status_code}
+        }
     )
 
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     """Handle general exceptions"""
-    logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    logger.error("Unhandled exception: %s", exc, exc_info=True)
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        content=ErrorResponse(
-            error="Internal server error",
-            details={"message": str(exc)} if settings.DEBUG else None
-        ).dict()
+        content={
+            "success": False,
+            "error": "Internal server error",
+            "details": {"message": str(exc)} if settings.DEBUG else None
+        }
     )
 
 
-# =====================================================
-# STARTUP & SHUTDOWN EVENTS
-# =====================================================
-
-@app.on_event("startup")
-async def startup_event():
-    """Run on application startup"""
-    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
-    logger.info(f"Debug mode: {settings.DEBUG}")
-
-    # Test connections
-    try:
-        supabase = get_supabase()
-        logger.info("✓ Supabase connection established")
-
-        # Test Redis connection
-        from config.redis_client import get_redis
-        redis = get_redis()
-        redis.ping()
-        logger.info("✓ Redis connection established")
-
-    except Exception as e:
-        logger.error(f"✗ Startup connection test failed: {e}")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Run on application shutdown"""
-    logger.info(f"Shutting down {settings.APP_NAME}")
-
-
 # =====================================================
 # MAIN ENTRY POINT
 # =====================================================
@@ -161,6 +211,8 @@ if __name__ == "__main__":
         "main:app",
         host="0.0.0.0",
         port=8002,  # Changed from 8000 to avoid conflict with media_scheduler
+        loop="uvloop",
+        http="httptools",
         reload=settings.DEBUG,
         log_level="debug" if settings.DEBUG else "info"
     )
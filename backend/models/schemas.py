@@ -5,6 +5,7 @@ from pydantic import BaseModel, Field, EmailStr
 from typing import Optional, List
 from datetime import datetime
 from uuid import UUID
+import msgspec
 
 
 # =====================================================
@@ -333,3 +334,33 @@ class ProcessingStatus(BaseModel):
     progress: int  # 0-100
     message: str
     error: Optional[str] = None
+
+
+# =====================================================
+# HOT-PATH STRUCTS (msgspec)
+# =====================================================
+# The pydantic models above stay at the FastAPI boundary for OpenAPI docs.
+# These msgspec.Struct equivalents are for high-frequency internal payloads
+# (Claude scope-item lists, Redis pub/sub progress updates) where msgspec's
+# C encoder/decoder is several times faster than pydantic + stdlib json.
+
+class ScopeItemStruct(msgspec.Struct):
+    """Scope item as parsed from the AI response (internal hot path)"""
+    cost_code: str
+    category: str
+    description: str
+    sub_code: Optional[str] = None
+    sub_category: Optional[str] = None
+    location: Optional[str] = None
+    materials: Optional[str] = None
+    quantity: Optional[str] = None
+    notes: Optional[str] = None
+    photos: List[str] = []
+    risk_level: Optional[str] = None
+
+
+class ProgressUpdate(msgspec.Struct):
+    """Progress message published to Redis pub/sub"""
+    pct: int
+    msg: str
+    type: str = "progress"
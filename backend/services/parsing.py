@@ -3,89 +3,83 @@ Claude (Anthropic) scope parsing service
 Replaces OpenAI GPT-4 for construction scope analysis
 """
 import anthropic
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from config.settings import settings
+import httpx
 import logging
-import json
+import msgspec
+import orjson
+import re
+from models.schemas import ScopeItemStruct
+from dataclasses import dataclass
 from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
-# Initialize Anthropic client
-client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+# Shared HTTP/2 transport: one TLS session multiplexes all concurrent
+# scope parses instead of each opening its own connection
+_http = httpx.AsyncClient(
+    http2=True,
+    timeout=60.0,
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+)
 
+# Initialize Anthropic client (async so generation never blocks the event loop)
+client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY, http_client=_http)
 
-# Default construction cost codes (fallback if client has none)
-# Standard industry categories - clients can define their own custom codes
-DEFAULT_COST_CODES = [
-    {"code": "01", "name": "General Conditions"},
-    {"code": "02", "name": "Site Preparation / Demolition"},
-    {"code": "03", "name": "Excavation / Grading / Landscape"},
-    {"code": "04", "name": "Concrete & Masonry"},
-    {"code": "05", "name": "Rough Carpentry / Framing"},
-    {"code": "06", "name": "Doors, Windows, Trim"},
-    {"code": "07", "name": "Mechanical (HVAC)"},
-    {"code": "08", "name": "Electrical"},
-    {"code": "09", "name": "Plumbing"},
-    {"code": "10", "name": "Wall & Ceiling Coverings (Drywall, Plaster)"},
-    {"code": "11", "name": "Finish Carpentry"},
-    {"code": "12", "name": "Cabinets, Vanities, Countertops"},
-    {"code": "13", "name": "Flooring / Tile"},
-    {"code": "14", "name": "Specialties (Appliances, Fixtures)"},
-    {"code": "15", "name": "Decking"},
-    {"code": "16", "name": "Fencing"},
-    {"code": "17", "name": "Exterior Facade (Siding, Brick, Stone)"},
-    {"code": "18", "name": "Soffit, Fascia, Gutters"},
-    {"code": "19", "name": "Roofing"},
-]
-
-
-class ScopeParsingService:
-    """Parse construction scope from transcripts using Claude"""
+# Extracts the JSON object from Claude's response in one pass, skipping any
+# markdown code fences the model wraps it in
+_JSON_RE = re.compile(rb"\{.*\}", re.S)
 
-    def __init__(self):
-        self.client = client
-
-    def _build_prompt(
-        self,
-        transcript: str,
-        cost_codes: Optional[List[Dict]] = None,
-        photo_descriptions: Optional[List[str]] = None
-    ) -> str:
-        """
-        Build construction-expert prompt for Claude
 
-        Args:
-            transcript: Video/audio transcript or text input
-            cost_codes: Client-specific cost codes (or None for default)
-            photo_descriptions: Descriptions of photos from Claude Vision
+@dataclass(slots=True, frozen=True)
+class CostCode:
+    """A cost code entry (immutable, slot-based for fast attribute access)"""
+    code: str
+    name: str
 
-        Returns:
-            Formatted prompt string
-        """
-        codes = cost_codes if cost_codes else DEFAULT_COST_CODES
 
-        # Format cost codes for prompt
-        codes_text = "\n".join([
-            f"- {c['code']}: {c['name']}"
-            for c in codes
-        ])
+# Default construction cost codes (fallback if client has none)
+# Standard industry categories - clients can define their own custom codes
+DEFAULT_COST_CODES: tuple[CostCode, ...] = (
+    CostCode("01", "General Conditions"),
+    CostCode("02", "Site Preparation / Demolition"),
+    CostCode("03", "Excavation / Grading / Landscape"),
+    CostCode("04", "Concrete & Masonry"),
+    CostCode("05", "Rough Carpentry / Framing"),
+    CostCode("06", "Doors, Windows, Trim"),
+    CostCode("07", "Mechanical (HVAC)"),
+    CostCode("08", "Electrical"),
+    CostCode("09", "Plumbing"),
+    CostCode("10", "Wall & Ceiling Coverings (Drywall, Plaster)"),
+    CostCode("11", "Finish Carpentry"),
+    CostCode("12", "Cabinets, Vanities, Countertops"),
+    CostCode("13", "Flooring / Tile"),
+    CostCode("14", "Specialties (Appliances, Fixtures)"),
+    CostCode("15", "Decking"),
+    CostCode("16", "Fencing"),
+    CostCode("17", "Exterior Facade (Siding, Brick, Stone)"),
+    CostCode("18", "Soffit, Fascia, Gutters"),
+    CostCode("19", "Roofing"),
+)
+
+
+# Static pieces of the prompt, built once at import so each request only
+# joins the variable parts (transcript, photo context, custom codes)
+_PROMPT_INTRO = """You are an expert construction estimator and scope analyst with 20+ years of experience. Your job is to analyze construction project information and extract a comprehensive scope of work.
 
-        # Add photo context if available
-        photo_context = ""
-        if photo_descriptions:
-            photo_context = "\n\nPHOTO ANALYSIS:\n"
-            for i, desc in enumerate(photo_descriptions, 1):
-                photo_context += f"\nPhoto {i}: {desc}\n"
+COST CODE SYSTEM:
+"""
 
-        prompt = f"""You are an expert construction estimator and scope analyst with 20+ years of experience. Your job is to analyze construction project information and extract a comprehensive scope of work.
+_DEFAULT_CODES_TEXT = "\n".join(
+    f"- {c.code}: {c.name}"
+    for c in DEFAULT_COST_CODES
+)
 
-COST CODE SYSTEM:
-{codes_text}
+# Prompt head for the common case (no client-specific codes)
+_DEFAULT_PROMPT_HEAD = _PROMPT_INTRO + _DEFAULT_CODES_TEXT
 
-TRANSCRIPT/PROJECT INFORMATION:
-{transcript}
-{photo_context}
+_PROMPT_TAIL = """
 
 Please analyze this construction project and extract:
 
@@ -115,16 +109,16 @@ Please analyze this construction project and extract:
    - Is location information clear?
 
 Return your analysis as a JSON object with this structure:
-{{
-  "project_summary": {{
+{
+  "project_summary": {
     "overview": "...",
     "key_requirements": ["...", "..."],
     "concerns": ["...", "..."],
     "decision_points": ["...", "..."],
     "important_notes": ["...", "..."]
-  }},
+  },
   "scope_items": [
-    {{
+    {
       "cost_code": "01",
       "category": "General Conditions",
       "sub_code": null,
@@ -135,14 +129,53 @@ Return your analysis as a JSON object with this structure:
       "quantity": "...",
       "notes": "...",
       "risk_level": "medium"
-    }}
+    }
   ],
   "scope_completeness_score": 75
-}}
+}
 
 Be thorough and extract every work item mentioned. If something is unclear, note it in decision_points. If materials/quantities aren't specified, write "To be determined" rather than guessing."""
 
-        return prompt
+
+class ScopeParsingService:
+    """Parse construction scope from transcripts using Claude"""
+
+    def _build_prompt(
+        self,
+        transcript: str,
+        cost_codes: Optional[List[Dict]] = None,
+        photo_descriptions: Optional[List[str]] = None
+    ) -> str:
+        """
+        Build construction-expert prompt for Claude
+
+        Args:
+            transcript: Video/audio transcript or text input
+            cost_codes: Client-specific cost codes (or None for default)
+            photo_descriptions: Descriptions of photos from Claude Vision
+
+        Returns:
+            Formatted prompt string
+        """
+        if cost_codes:
+            head = _PROMPT_INTRO + "\n".join(
+                f"- {c['code']}: {c['name']}"
+                for c in cost_codes
+            )
+        else:
+            head = _DEFAULT_PROMPT_HEAD
+
+        parts = [head, "\n\nTRANSCRIPT/PROJECT INFORMATION:\n", transcript, "\n"]
+
+        # Add photo context if available
+        if photo_descriptions:
+            parts.append("\n\nPHOTO ANALYSIS:\n")
+            for i, desc in enumerate(photo_descriptions, 1):
+                parts.append(f"\nPhoto {i}: {desc}\n")
+
+        parts.append(_PROMPT_TAIL)
+
+        return "".join(parts)
 
     async def parse_scope(
         self,
@@ -166,57 +199,76 @@ Be thorough and extract every work item mentioned. If something is unclear, note
 
             prompt = self._build_prompt(transcript, cost_codes, photo_descriptions)
 
-            # Call Claude API
-            message = self.client.messages.create(
+            # Call Claude API, streaming so the event loop stays free during
+            # the multi-second generation and other requests can proceed
+            chunks = []
+            async with client.messages.stream(
                 model=settings.CLAUDE_MODEL,
                 max_tokens=settings.CLAUDE_MAX_TOKENS,
                 temperature=settings.CLAUDE_TEMPERATURE,
                 messages=[
                     {"role": "user", "content": prompt}
                 ]
-            )
+            ) as stream:
+                async for text in stream.text_stream:
+                    chunks.append(text)
+                message = await stream.get_final_message()
 
-            # Extract response
-            response_text = message.content[0].text
+            response_text = "".join(chunks)
 
             # Parse JSON response
-            # Claude sometimes wraps JSON in markdown code blocks, so clean it
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0].strip()
-
-            result = json.loads(response_text)
+            # Claude sometimes wraps JSON in markdown code blocks; the regex
+            # grabs the outermost object directly, so no fence stripping needed
+            match = _JSON_RE.search(response_text.encode())
+            if match is None:
+                raise orjson.JSONDecodeError("No JSON object in response", response_text, 0)
+
+            result = orjson.loads(match.group(0))
+
+            # Normalize scope items through the msgspec struct: unknown or
+            # missing fields are handled here, in C, instead of by per-field
+            # dict checks in every downstream consumer
+            items = msgspec.convert(
+                result.get("scope_items", []), list[ScopeItemStruct], strict=False
+            )
+            result["scope_items"] = msgspec.to_builtins(items)
 
-            # Calculate cost (Claude pricing: ~$3 per million input tokens, $15 per million output)
-            # This is approximate
+            # Calculate cost in integer microdollars (Claude pricing: $3 per
+            # million input tokens, $15 per million output). Exact integer
+            # arithmetic; only converted to dollars at the presentation boundary.
             input_tokens = message.usage.input_tokens
             output_tokens = message.usage.output_tokens
-            cost_usd = (input_tokens / 1_000_000 * 3.0) + (output_tokens / 1_000_000 * 15.0)
+            cost_micro = input_tokens * 3 + output_tokens * 15
 
-            logger.info(f"Scope parsing completed. Items: {len(result.get('scope_items', []))}")
-            logger.info(f"Cost: ${cost_usd:.4f}")
+            logger.info("Scope parsing completed. Items: %d", len(result.get("scope_items", [])))
+            logger.info("Cost: $%.4f", cost_micro / 1_000_000)
 
             # Add metadata
             result["metadata"] = {
                 "model": settings.CLAUDE_MODEL,
                 "input_tokens": input_tokens,
                 "output_tokens": output_tokens,
-                "cost_usd": round(cost_usd, 4)
+                "cost_micro": cost_micro,
+                "cost_usd": cost_micro / 1_000_000
             }
 
             return result
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse Claude response as JSON: {e}")
-            logger.error(f"Response: {response_text}")
+        except orjson.JSONDecodeError as e:
+            logger.error("Failed to parse Claude response as JSON: %s", e)
+            logger.error("Response: %s", response_text)
             raise Exception("Failed to parse AI response. Please try again.")
 
         except Exception as e:
-            logger.error(f"Error parsing scope with Claude: {e}")
+            logger.error("Error parsing scope with Claude: %s", e)
             raise
 
 
+async def close_parsing_client():
+    """Close the shared Anthropic client (call on application shutdown)"""
+    await client.close()
+
+
 # Global instance
 scope_parsing_service = ScopeParsingService()
 
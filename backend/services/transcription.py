@@ -2,8 +2,15 @@
 AssemblyAI transcription service
 Replaces OpenAI Whisper for ban-proof transcription
 """
+import asyncio
+import functools
+import os
+import tempfile
+import orjson
 import assemblyai as aai
+import httpx
 from config.settings import settings
+from config.redis_client import redis_async
 import logging
 from typing import Optional, Dict
 
@@ -12,26 +19,111 @@ logger = logging.getLogger(__name__)
 # Configure AssemblyAI
 aai.settings.api_key = settings.ASSEMBLYAI_API_KEY
 
+# Shared HTTP client for cheap metadata probes (HEAD requests); bulk
+# downloads still open their own streaming client
+_http = httpx.AsyncClient(timeout=30.0)
+
+# Transcripts keyed by the storage object's ETag: re-processing the same
+# uploaded file skips the whole AssemblyAI job
+_ETAG_CACHE_TTL_SECONDS = 7 * 86400
+
+# Files longer than this are split and transcribed in parallel; below it
+# the fixed cost of download + segmentation outweighs the speedup
+_CHUNK_THRESHOLD_SECONDS = 600
+
+
+async def close_transcription_client():
+    """Close the shared HTTP client (call on application shutdown)"""
+    await _http.aclose()
+
+
+async def _probe_duration_seconds(file_url: str) -> Optional[float]:
+    """Read the source duration from its container header (best effort)"""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            file_url,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await proc.communicate()
+        return float(stdout.strip())
+    except Exception as e:
+        logger.warning("Duration probe failed for %s: %s", file_url, e)
+        return None
+
 
 class TranscriptionService:
     """Handle audio/video transcription with AssemblyAI"""
 
     def __init__(self):
         self.transcriber = aai.Transcriber()
+        # Bound concurrent jobs to AssemblyAI's account concurrency cap.
+        # Chunk jobs get their own semaphore: a caller holding a _sem
+        # permit for a whole file must never wait on _sem again for that
+        # file's chunks, or enough long files deadlock the service.
+        self._sem = asyncio.Semaphore(settings.AAI_MAX_CONCURRENCY)
+        self._chunk_sem = asyncio.Semaphore(settings.AAI_MAX_CONCURRENCY)
+        # Futures resolved by the AssemblyAI webhook endpoint, keyed by
+        # transcript id (webhook mode only)
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def resolve_webhook(self, transcript_id: str, status: str = "completed"):
+        """Resolve the pending future for a finished transcript (webhook callback)"""
+        future = self._pending.get(transcript_id)
+        if future is not None and not future.done():
+            future.set_result(status)
+
+    async def _transcribe_via_webhook(self, file_url: str, config: aai.TranscriptionConfig):
+        """
+        Submit a job and wait for the AssemblyAI webhook instead of polling
+
+        Polling costs a GET every few seconds for the whole job (hundreds
+        of round-trips on a long file); the webhook notifies us the moment
+        AssemblyAI finishes.
+        """
+        loop = asyncio.get_running_loop()
+        transcript = await loop.run_in_executor(
+            None,
+            functools.partial(self.transcriber.submit, file_url, config=config)
+        )
+
+        future = loop.create_future()
+        self._pending[transcript.id] = future
+        try:
+            await future
+        finally:
+            self._pending.pop(transcript.id, None)
+
+        # Fetch the finished transcript (single GET, job is already done)
+        return await loop.run_in_executor(
+            None, aai.Transcript.get_by_id, transcript.id
+        )
 
     async def transcribe_file(
         self,
         file_url: str,
         enable_speaker_labels: bool = True,
-        language_code: str = "en"
+        language_code: str = "en",
+        include_words_sample: bool = False,
+        _skip_chunking: bool = False
     ) -> Dict:
         """
         Transcribe audio or video file using AssemblyAI
 
+        Files longer than _CHUNK_THRESHOLD_SECONDS are split into segments
+        and transcribed in parallel via _chunk_and_transcribe.
+
         Args:
             file_url: URL to the audio/video file (can be Supabase Storage URL)
             enable_speaker_labels: Enable speaker diarization (multiple speakers)
             language_code: Language code (default: "en" for English)
+            include_words_sample: Include per-word timestamps in the result
+                (off by default - most callers only store the text)
+            _skip_chunking: Internal - set on per-chunk calls so short
+                segments skip the duration probe
 
         Returns:
             Dict with transcript text, speakers, confidence, etc.
@@ -39,16 +131,66 @@ class TranscriptionService:
         try:
             logger.info(f"Starting transcription for: {file_url}")
 
+            # ETag fast path: an unchanged storage object means the same
+            # audio, so return the cached transcript after one HEAD request
+            etag_key = None
+            try:
+                head = await _http.head(file_url)
+                etag = head.headers.get("etag")
+                if etag:
+                    # Every option that changes the result shape must be in
+                    # the key, or a words-less cached result gets served to
+                    # callers that need word timestamps
+                    etag_key = (
+                        "transcript:etag:" + etag.strip('"')
+                        + f":{int(enable_speaker_labels)}:{language_code}"
+                        + f":{int(include_words_sample)}"
+                    )
+                    cached = await redis_async.get(etag_key)
+                    if cached is not None:
+                        logger.info("Transcription ETag cache hit: %s", file_url)
+                        return orjson.loads(cached)
+            except Exception as e:
+                logger.warning("ETag cache check failed: %s", e)
+
+            # Long files: split and transcribe segments in parallel
+            if not _skip_chunking:
+                duration = await _probe_duration_seconds(file_url)
+                if duration and duration > _CHUNK_THRESHOLD_SECONDS:
+                    result = await self._chunk_and_transcribe(
+                        file_url,
+                        enable_speaker_labels=enable_speaker_labels,
+                        language_code=language_code
+                    )
+                    if etag_key:
+                        try:
+                            await redis_async.setex(
+                                etag_key, _ETAG_CACHE_TTL_SECONDS, orjson.dumps(result)
+                            )
+                        except Exception as e:
+                            logger.warning("Transcript cache write failed: %s", e)
+                    return result
+
             # Configure transcription
             config = aai.TranscriptionConfig(
                 speaker_labels=enable_speaker_labels,
                 language_code=language_code,
                 punctuate=True,
-                format_text=True
+                format_text=True,
+                webhook_url=settings.ASSEMBLYAI_WEBHOOK_URL
             )
 
-            # Start transcription
-            transcript = self.transcriber.transcribe(file_url, config=config)
+            if settings.ASSEMBLYAI_WEBHOOK_URL:
+                # Webhook mode: submit and wait for the callback, no polling
+                transcript = await self._transcribe_via_webhook(file_url, config)
+            else:
+                # Polling mode. The SDK call blocks for the whole job
+                # (upload + poll), so run it in a worker thread to keep the
+                # event loop free for concurrent requests.
+                transcript = await asyncio.get_running_loop().run_in_executor(
+                    None,
+                    functools.partial(self.transcriber.transcribe, file_url, config=config)
+                )
 
             # Wait for completion
             if transcript.status == aai.TranscriptStatus.error:
@@ -62,7 +204,10 @@ class TranscriptionService:
                 "text": transcript.text,
                 "confidence": transcript.confidence,
                 "audio_duration": transcript.audio_duration,
-                "word_count": len(transcript.text.split()) if transcript.text else 0,
+                # The word list is already counted - no need to re-split the
+                # full transcript text
+                "word_count": len(transcript.words) if transcript.words
+                else (len(transcript.text.split()) if transcript.text else 0),
                 "language": transcript.language_code,
                 "status": "completed"
             }
@@ -81,7 +226,7 @@ class TranscriptionService:
                 result["speakers"] = speakers
 
             # Add words with timestamps (useful for video timestamp linking in Phase 3)
-            if transcript.words:
+            if include_words_sample and transcript.words:
                 words = []
                 for word in transcript.words[:100]:  # Limit to first 100 for storage
                     words.append({
@@ -97,12 +242,135 @@ class TranscriptionService:
             hours = (transcript.audio_duration / 3600) if transcript.audio_duration else 0
             result["cost_usd"] = round(hours * 0.25, 4)
 
+            if etag_key:
+                try:
+                    await redis_async.setex(
+                        etag_key, _ETAG_CACHE_TTL_SECONDS, orjson.dumps(result)
+                    )
+                except Exception as e:
+                    logger.warning("Transcript cache write failed: %s", e)
+
             return result
 
         except Exception as e:
             logger.error(f"Error transcribing file: {e}")
             raise
 
+    async def _chunk_and_transcribe(
+        self,
+        file_url: str,
+        chunk_seconds: int = 120,
+        enable_speaker_labels: bool = True,
+        language_code: str = "en"
+    ) -> Dict:
+        """
+        Split a long file into chunks and transcribe them in parallel
+
+        AssemblyAI processes one job at roughly 20% of audio length, so a
+        multi-hour file is one long serial job. Splitting into ~2 minute
+        segments and transcribing them concurrently makes wall time roughly
+        the slowest chunk instead of the whole file.
+
+        Args:
+            file_url: URL to the source audio/video file
+            chunk_seconds: Segment length in seconds
+            enable_speaker_labels: Enable speaker diarization per chunk
+            language_code: Language code
+
+        Returns:
+            Dict in the same shape as transcribe_file, with word timestamps
+            offset back to the original file's timeline
+        """
+        with tempfile.TemporaryDirectory(prefix="aai_chunks_") as tmp_dir:
+            # Download the source once
+            src_path = os.path.join(tmp_dir, "source")
+            async with httpx.AsyncClient(timeout=120.0) as http:
+                async with http.stream("GET", file_url) as response:
+                    response.raise_for_status()
+                    with open(src_path, "wb") as f:
+                        async for chunk in response.aiter_bytes():
+                            f.write(chunk)
+
+            # Re-encode while segmenting: stream copy can only cut on
+            # keyframes (so segment lengths drift and the fixed offsets
+            # below go stale) and fails outright for non-AAC sources
+            pattern = os.path.join(tmp_dir, "chunk%03d.mp3")
+            proc = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-y", "-i", src_path,
+                "-f", "segment", "-segment_time", str(chunk_seconds),
+                "-reset_timestamps", "1",
+                "-vn", "-acodec", "libmp3lame", "-b:a", "64k",
+                "-ac", "1", "-ar", "16000", pattern,
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+            _, stderr = await proc.communicate()
+            if proc.returncode != 0:
+                raise Exception(f"ffmpeg segmentation failed: {stderr.decode(errors='replace')[-500:]}")
+
+            chunk_paths = sorted(
+                os.path.join(tmp_dir, name)
+                for name in os.listdir(tmp_dir)
+                if name.startswith("chunk")
+            )
+            logger.info("Split %s into %d chunks of %ds", file_url, len(chunk_paths), chunk_seconds)
+
+            loop = asyncio.get_running_loop()
+
+            async def transcribe_chunk(path):
+                # Each chunk is its own AssemblyAI job, so hold the permit
+                # across the whole upload + transcription, not just the
+                # upload - that is where the account concurrency cap applies
+                async with self._chunk_sem:
+                    chunk_url = await loop.run_in_executor(
+                        None, aai.extras.upload_file, path
+                    )
+                    return await self.transcribe_file(
+                        chunk_url,
+                        enable_speaker_labels=enable_speaker_labels,
+                        language_code=language_code,
+                        # Word timestamps are needed to stitch the chunk
+                        # timelines back together
+                        include_words_sample=True,
+                        _skip_chunking=True
+                    )
+
+            results = await asyncio.gather(*(transcribe_chunk(p) for p in chunk_paths))
+
+        # Re-stitch in order, shifting timestamps back to the source timeline
+        merged = {
+            "text": " ".join(r["text"] for r in results if r["text"]),
+            "confidence": min((r["confidence"] for r in results if r.get("confidence") is not None), default=None),
+            "audio_duration": sum(r.get("audio_duration") or 0 for r in results),
+            "word_count": sum(r.get("word_count", 0) for r in results),
+            "language": language_code,
+            "status": "completed",
+            "cost_usd": round(sum(r.get("cost_usd", 0) for r in results), 4)
+        }
+
+        speakers = []
+        words = []
+        for index, result in enumerate(results):
+            offset_ms = index * chunk_seconds * 1000
+            for utterance in result.get("speakers", []):
+                speakers.append({
+                    **utterance,
+                    "start": utterance["start"] + offset_ms,
+                    "end": utterance["end"] + offset_ms
+                })
+            for word in result.get("words_sample", []):
+                words.append({
+                    **word,
+                    "start": word["start"] + offset_ms,
+                    "end": word["end"] + offset_ms
+                })
+        if speakers:
+            merged["speakers"] = speakers
+        if words:
+            merged["words_sample"] = words[:100]
+
+        return merged
+
     async def transcribe_multiple(
         self,
         file_urls: list[str],
@@ -121,17 +389,28 @@ class TranscriptionService:
         try:
             logger.info(f"Transcribing {len(file_urls)} files...")
 
+            # Dispatch all files concurrently; the semaphore keeps us under
+            # the AssemblyAI concurrency cap. Wall time drops from the sum
+            # of per-file times to roughly the slowest file.
+            async def transcribe_one(url):
+                async with self._sem:
+                    return await self.transcribe_file(
+                        url,
+                        enable_speaker_labels=enable_speaker_labels
+                    )
+
+            results = await asyncio.gather(
+                *(transcribe_one(url) for url in file_urls),
+                return_exceptions=True
+            )
+
             all_transcripts = []
             total_cost = 0.0
             total_duration = 0
 
-            for i, url in enumerate(file_urls, 1):
-                logger.info(f"Processing file {i}/{len(file_urls)}")
-
-                result = await self.transcribe_file(
-                    url,
-                    enable_speaker_labels=enable_speaker_labels
-                )
+            for i, result in enumerate(results, 1):
+                if isinstance(result, BaseException):
+                    raise result
 
                 all_transcripts.append({
                     "file_index": i,
@@ -3,18 +3,76 @@ Claude Vision service for photo analysis
 Analyzes construction site photos for materials, conditions, and scope items
 """
 import anthropic
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from config.settings import settings
+from config.redis_client import redis_async
+import asyncio
+import hashlib
 import logging
-import json
+import orjson
+import random
 from typing import Dict, List
 import base64
 import httpx
+import io
+from PIL import Image
 
 logger = logging.getLogger(__name__)
 
-# Initialize Anthropic client
-client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+# Shared HTTP client for image downloads. One pool per process keeps
+# connections warm instead of paying DNS + TLS handshake per photo.
+_http = httpx.AsyncClient(
+    http2=True,
+    timeout=30.0,
+    limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100)
+)
+
+# Initialize Anthropic client (async, sharing the HTTP/2 pool above so
+# image downloads and Claude calls multiplex over warm connections)
+client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY, http_client=_http)
+
+
+async def close_vision_client():
+    """Close the shared image-download client (call on application shutdown)"""
+    await _http.aclose()
+
+
+# Retry policy for rate-limited / overloaded Claude calls
+_MAX_ATTEMPTS = 3
+_BACKOFF_BASE_SECONDS = 1.0
+_BACKOFF_CAP_SECONDS = 30.0
+
+# Byte-identical photos (re-uploads, re-sends across jobs) are common on
+# construction projects; caching by content hash skips the Claude call and
+# its dollar cost entirely on repeats
+_PHOTO_CACHE_TTL_SECONDS = 30 * 86400
+
+# ETag-keyed entries are cheaper to check (one HEAD, no download) but the
+# tag only proves the storage object is unchanged, so keep a shorter TTL
+_ETAG_CACHE_TTL_SECONDS = 7 * 86400
+
+# Claude bills image tokens by pixel count and reads nothing useful above
+# ~1568px on the long edge; phone photos are routinely 4000x3000
+_MAX_IMAGE_EDGE = 1568
+_JPEG_QUALITY = 85
+
+# Forced tool schema so Claude returns the analysis as a typed dict instead
+# of markdown-fenced JSON text (fewer output tokens, no parse failures)
+_REPORT_TOOL = {
+    "name": "report",
+    "description": "Report the structured analysis of a construction site photo",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "caption": {"type": "string"},
+            "materials": {"type": "array", "items": {"type": "string"}},
+            "conditions": {"type": "array", "items": {"type": "string"}},
+            "risks": {"type": "array", "items": {"type": "string"}},
+            "scope_category": {"type": "string"}
+        },
+        "required": ["caption", "materials", "conditions", "risks", "scope_category"]
+    }
+}
 
 
 class VisionService:
@@ -22,6 +80,79 @@ class VisionService:
 
     def __init__(self):
         self.client = client
+        # Bound concurrent Claude Vision calls to stay under rate limits
+        self._sem = asyncio.Semaphore(8)
+
+    async def _analyze_one(self, image_url: str, context: str = "") -> Dict:
+        """
+        Analyze a single photo under the concurrency cap, retrying
+        rate-limit and overloaded errors with exponential backoff + jitter
+        """
+        async with self._sem:
+            for attempt in range(1, _MAX_ATTEMPTS + 1):
+                try:
+                    return await self.analyze_photo(image_url, context)
+                # Only transient failures are worth retrying; a 400/401/404
+                # will fail identically on every attempt
+                except (
+                    anthropic.RateLimitError,
+                    anthropic.InternalServerError,
+                    anthropic.APIConnectionError,
+                ) as e:
+                    if attempt == _MAX_ATTEMPTS:
+                        raise
+                    delay = min(
+                        _BACKOFF_BASE_SECONDS * 2 ** (attempt - 1),
+                        _BACKOFF_CAP_SECONDS
+                    ) * (0.5 + random.random())
+                    logger.warning(
+                        "Claude rate limited (attempt %d/%d), retrying in %.1fs: %s",
+                        attempt, _MAX_ATTEMPTS, delay, e
+                    )
+                    await asyncio.sleep(delay)
+
+    @staticmethod
+    def _shrink_image(image_data: bytes):
+        """
+        Downscale an oversized photo to the largest size Claude actually
+        uses and re-encode as JPEG. Returns None when the image is already
+        small enough, so the cheaper URL path can be used instead.
+        """
+        img = Image.open(io.BytesIO(image_data))
+        if img.width <= _MAX_IMAGE_EDGE and img.height <= _MAX_IMAGE_EDGE:
+            return None
+        img.thumbnail((_MAX_IMAGE_EDGE, _MAX_IMAGE_EDGE), Image.LANCZOS)
+        buf = io.BytesIO()
+        img.convert("RGB").save(buf, "JPEG", quality=_JPEG_QUALITY, optimize=True)
+        return buf.getvalue()
+
+    @staticmethod
+    def _media_type_for(image_url: str) -> str:
+        """Guess the image MIME type from the URL extension"""
+        lowered = image_url.lower()
+        if lowered.endswith('.png'):
+            return "image/png"
+        if lowered.endswith('.webp'):
+            return "image/webp"
+        return "image/jpeg"
+
+    async def _call_vision(self, image_source: Dict, prompt: str):
+        """Send one image + prompt to Claude Vision, forcing the report tool"""
+        return await self.client.messages.create(
+            model=settings.CLAUDE_MODEL,
+            max_tokens=1024,
+            tools=[_REPORT_TOOL],
+            tool_choice={"type": "tool", "name": "report"},
+            messages=[
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "image", "source": image_source},
+                        {"type": "text", "text": prompt}
+                    ]
+                }
+            ]
+        )
 
     async def analyze_photo(
         self,
@@ -41,19 +172,45 @@ class VisionService:
         try:
             logger.info(f"Analyzing photo: {image_url}")
 
+            # ETag fast path: if the storage object is unchanged, return the
+            # cached analysis after a single HEAD request
+            etag_key = None
+            try:
+                head = await _http.head(image_url)
+                etag = head.headers.get("etag")
+                if etag:
+                    etag_key = (
+                        "vision:etag:" + etag.strip('"')
+                        + ":" + hashlib.sha256(context.encode()).hexdigest()[:16]
+                    )
+                    cached = await redis_async.get(etag_key)
+                    if cached is not None:
+                        logger.info("Photo analysis ETag cache hit: %s", image_url)
+                        return orjson.loads(cached)
+            except Exception as e:
+                logger.warning("ETag cache check failed: %s", e)
+
             # Download image and convert to base64
-            async with httpx.AsyncClient() as client_http:
-                response = await client_http.get(image_url)
-                response.raise_for_status()
-                image_data = response.content
-                image_base64 = base64.b64encode(image_data).decode('utf-8')
-
-            # Determine media type from URL
-            media_type = "image/jpeg"
-            if image_url.lower().endswith('.png'):
-                media_type = "image/png"
-            elif image_url.lower().endswith('.webp'):
-                media_type = "image/webp"
+            response = await _http.get(image_url)
+            response.raise_for_status()
+            image_data = response.content
+
+            # Cache lookup keyed on image content + analysis context, so a
+            # byte-identical re-upload returns without another Claude call
+            cache_key = (
+                "vision:"
+                + hashlib.sha256(image_data).hexdigest()
+                + ":"
+                + hashlib.sha256(context.encode()).hexdigest()[:16]
+            )
+            try:
+                cached = await redis_async.get(cache_key)
+            except Exception as e:
+                logger.warning("Photo cache read failed: %s", e)
+                cached = None
+            if cached is not None:
+                logger.info("Photo analysis cache hit: %s", image_url)
+                return orjson.loads(cached)
 
             # Build prompt
             prompt = f"""You are an expert construction inspector analyzing a construction site photo.
@@ -68,52 +225,49 @@ Please analyze this photo and provide:
 4. **Risks**: Any safety concerns, quality issues, or potential problems
 5. **Scope Category**: Which construction category this relates to (Plumbing, Electrical, Framing, Flooring, etc.)
 
-Return your analysis as JSON:
-{{
-  "caption": "...",
-  "materials": ["...", "..."],
-  "conditions": ["...", "..."],
-  "risks": ["...", "..."],
-  "scope_category": "..."
-}}
+Report your analysis with the "report" tool.
 
 Be specific and professional. Note anything that might affect cost, timeline, or quality."""
 
-            # Call Claude Vision API
-            message = self.client.messages.create(
-                model=settings.CLAUDE_MODEL,
-                max_tokens=1024,
-                messages=[
+            # Oversized photos cost pixels-proportional input tokens, so
+            # downscale them locally and send the small JPEG as base64.
+            # Images already within limits go as a URL so Anthropic fetches
+            # them directly (no base64 payload blowup on our egress), with
+            # base64 as a fallback if the URL is not reachable for them.
+            shrunk = self._shrink_image(image_data)
+            if shrunk is not None:
+                logger.info(
+                    "Downscaled photo %s: %d -> %d bytes",
+                    image_url, len(image_data), len(shrunk)
+                )
+                message = await self._call_vision(
                     {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": media_type,
-                                    "data": image_base64
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ]
-                    }
-                ]
-            )
-
-            # Extract response
-            response_text = message.content[0].text
-
-            # Parse JSON
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0].strip()
-
-            result = json.loads(response_text)
+                        "type": "base64",
+                        "media_type": "image/jpeg",
+                        "data": base64.b64encode(shrunk).decode('utf-8')
+                    },
+                    prompt
+                )
+            else:
+                try:
+                    message = await self._call_vision(
+                        {"type": "url", "url": image_url},
+                        prompt
+                    )
+                except anthropic.BadRequestError as e:
+                    logger.warning("URL image source rejected, falling back to base64: %s", e)
+                    message = await self._call_vision(
+                        {
+                            "type": "base64",
+                            "media_type": self._media_type_for(image_url),
+                            "data": base64.b64encode(image_data).decode('utf-8')
+                        },
+                        prompt
+                    )
+
+            # The forced tool call returns the analysis as a typed dict -
+            # no markdown fences to strip, no JSON text to parse
+            result = dict(message.content[0].input)
 
             # Calculate cost
             input_tokens = message.usage.input_tokens
@@ -128,6 +282,14 @@ Be specific and professional. Note anything that might affect cost, timeline, or
 
             logger.info(f"Photo analysis completed. Cost: ${cost_usd:.4f}")
 
+            try:
+                payload = orjson.dumps(result)
+                await redis_async.setex(cache_key, _PHOTO_CACHE_TTL_SECONDS, payload)
+                if etag_key:
+                    await redis_async.setex(etag_key, _ETAG_CACHE_TTL_SECONDS, payload)
+            except Exception as e:
+                logger.warning("Photo cache write failed: %s", e)
+
             return result
 
         except Exception as e:
@@ -152,16 +314,17 @@ Be specific and professional. Note anything that might affect cost, timeline, or
         try:
             logger.info(f"Analyzing {len(image_urls)} photos...")
 
-            results = []
-            total_cost = 0.0
+            # Fan out all photos at once; _analyze_one caps concurrency and
+            # retries transient rate-limit errors, so batch latency is
+            # bounded by the slowest photo rather than the sum
+            results = list(await asyncio.gather(
+                *(self._analyze_one(url, context) for url in image_urls)
+            ))
 
-            for i, url in enumerate(image_urls, 1):
-                logger.info(f"Processing photo {i}/{len(image_urls)}")
-
-                result = await self.analyze_photo(url, context)
-                results.append(result)
-
-                total_cost += result.get("metadata", {}).get("cost_usd", 0)
+            total_cost = sum(
+                result.get("metadata", {}).get("cost_usd", 0)
+                for result in results
+            )
 
             logger.info(f"All photos analyzed. Total cost: ${total_cost:.4f}")
 
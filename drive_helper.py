@@ -1,6 +1,7 @@
 import os
 import json
 import tempfile
+from functools import lru_cache
 from typing import Optional
 from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
@@ -10,10 +11,35 @@ import streamlit as st
 # Google Drive API scopes
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
 
+# Extension -> MIME type table, built once at import
+_MIME = {
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.pdf': 'application/pdf',
+    '.txt': 'text/plain',
+    '.mp4': 'video/mp4',
+    '.mp3': 'audio/mpeg'
+}
+
+# Resumable upload chunk size: large enough to keep throughput up, small
+# enough that a transient failure only re-sends one chunk
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+def _execute_resumable(request) -> dict:
+    """Drive a resumable upload request to completion, chunk by chunk."""
+    response = None
+    while response is None:
+        _, response = request.next_chunk(num_retries=5)
+    return response
+
+@lru_cache(maxsize=1)
 def get_drive_service():
     """
     Create and return a Google Drive service object using service account credentials.
     
+    Cached for the life of the process: parsing the credentials JSON and
+    building the service (which fetches the discovery document) only
+    happens on the first call, so per-export auth overhead drops to zero.
+    
     Returns:
         googleapiclient.discovery.Resource: Google Drive service object
         
@@ -43,8 +69,10 @@ def get_drive_service():
             scopes=SCOPES
         )
         
-        # Build the service
-        service = build('drive', 'v3', credentials=credentials)
+        # Build the service. cache_discovery=False skips the deprecated
+        # oauth2client file cache (and its warning); the service object
+        # itself is cached above so discovery is fetched once per process.
+        service = build('drive', 'v3', credentials=credentials, cache_discovery=False)
         
         return service
         
@@ -77,7 +105,7 @@ def copy_template(service, template_file_id: str, new_name: str, parent_folder_i
         result = service.files().copy(
             fileId=template_file_id,
             body=copied_file
-        ).execute()
+        ).execute(num_retries=5)
         
         return result.get('id')
         
@@ -113,15 +141,21 @@ def upload_file(service, file_path: str, folder_id: str, filename: str = None) -
             'parents': [folder_id]
         }
         
-        # Create media upload object
-        media = MediaFileUpload(file_path, mimetype=mime_type)
+        # Create media upload object (resumable, so transient failures
+        # retry per-chunk instead of re-sending the whole file)
+        media = MediaFileUpload(
+            file_path,
+            mimetype=mime_type,
+            resumable=True,
+            chunksize=UPLOAD_CHUNK_SIZE
+        )
         
         # Upload the file
-        result = service.files().create(
+        result = _execute_resumable(service.files().create(
             body=file_metadata,
             media_body=media,
             fields='id'
-        ).execute()
+        ))
         
         return result.get('id')
         
@@ -147,15 +181,21 @@ def update_file(service, file_id: str, file_path: str) -> str:
         # Determine MIME type based on file extension
         mime_type = get_mime_type(file_path)
         
-        # Create media upload object
-        media = MediaFileUpload(file_path, mimetype=mime_type)
+        # Create media upload object (resumable, so transient failures
+        # retry per-chunk instead of re-sending the whole file)
+        media = MediaFileUpload(
+            file_path,
+            mimetype=mime_type,
+            resumable=True,
+            chunksize=UPLOAD_CHUNK_SIZE
+        )
         
         # Update the file
-        result = service.files().update(
+        result = _execute_resumable(service.files().update(
             fileId=file_id,
             media_body=media,
             fields='id'
-        ).execute()
+        ))
         
         return result.get('id')
         
@@ -180,7 +220,7 @@ def get_file_info(service, file_id: str) -> dict:
         result = service.files().get(
             fileId=file_id,
             fields='id,name,mimeType,parents,webViewLink'
-        ).execute()
+        ).execute(num_retries=5)
         
         return result
         
@@ -199,7 +239,7 @@ def check_folder_access(service, folder_id: str) -> bool:
         bool: True if accessible, False otherwise
     """
     try:
-        service.files().get(fileId=folder_id, fields='id,name').execute()
+        service.files().get(fileId=folder_id, fields='id,name').execute(num_retries=5)
         return True
     except Exception:
         return False
@@ -214,17 +254,12 @@ def get_mime_type(file_path: str) -> str:
     Returns:
         str: MIME type
     """
-    extension = os.path.splitext(file_path)[1].lower()
-    
-    mime_types = {
-        '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        '.pdf': 'application/pdf',
-        '.txt': 'text/plain',
-        '.mp4': 'video/mp4',
-        '.mp3': 'audio/mpeg'
-    }
+    # Final-dot slice instead of os.path.splitext - same result for the
+    # extensions we map, without the path-parsing overhead
+    dot = file_path.rfind('.')
+    extension = file_path[dot:].lower() if dot >= 0 else ''
     
-    return mime_types.get(extension, 'application/octet-stream')
+    return _MIME.get(extension, 'application/octet-stream')
 
 def create_shareable_link(service, file_id: str) -> str:
     """
@@ -250,13 +285,13 @@ def create_shareable_link(service, file_id: str) -> str:
         service.permissions().create(
             fileId=file_id,
             body=permission
-        ).execute()
+        ).execute(num_retries=5)
         
         # Get the file info with web view link
         file_info = service.files().get(
             fileId=file_id,
             fields='webViewLink'
-        ).execute()
+        ).execute(num_retries=5)
         
         return file_info.get('webViewLink', '')
         
@@ -277,17 +312,35 @@ def validate_drive_setup(drive_folder_id: str, template_file_id: str) -> tuple[b
     try:
         service = get_drive_service()
         
+        # Fetch folder and template metadata in one batched round-trip
+        # instead of two sequential HTTPS requests
+        results = {}
+        
+        def _collect(request_id, response, exception):
+            results[request_id] = (response, exception)
+        
+        batch = service.new_batch_http_request(callback=_collect)
+        batch.add(
+            service.files().get(fileId=drive_folder_id, fields='id,name'),
+            request_id='folder'
+        )
+        batch.add(
+            service.files().get(fileId=template_file_id, fields='id,name,mimeType'),
+            request_id='template'
+        )
+        batch.execute()
+        
         # Check folder access
-        if not check_folder_access(service, drive_folder_id):
+        _, folder_error = results['folder']
+        if folder_error is not None:
             return False, f"Cannot access folder with ID: {drive_folder_id}"
         
         # Check template file access
-        try:
-            template_info = get_file_info(service, template_file_id)
-            if 'docx' not in template_info.get('mimeType', ''):
-                return False, f"Template file is not a DOCX file: {template_file_id}"
-        except Exception:
+        template_info, template_error = results['template']
+        if template_error is not None:
             return False, f"Cannot access template file with ID: {template_file_id}"
+        if 'docx' not in template_info.get('mimeType', ''):
+            return False, f"Template file is not a DOCX file: {template_file_id}"
         
         return True, "Google Drive setup is valid"
         
@@ -1,13 +1,37 @@
+import asyncio
+import copy
 import os
-import json
-from typing import List, Dict
+import orjson
+from functools import lru_cache
+from operator import itemgetter
+from typing import Callable, List, Dict, Literal, Optional
+import pandas as pd
 import streamlit as st
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, LengthFinishReasonError
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Read once at import; parse_scope still raises at call time if unset so a
+# misconfigured .env surfaces where the user can see it in Streamlit
+_API_KEY = os.getenv('OPENAI_API_KEY')
+
+# Parsing model, overridable from the environment for A/B runs (e.g.
+# SCOPE_PARSE_MODEL=gpt-4o for a quality comparison)
+_PARSE_MODEL = os.getenv('SCOPE_PARSE_MODEL', 'gpt-4o-mini')
+
+
+@lru_cache(maxsize=1)
+def _get_client() -> OpenAI:
+    """
+    Shared OpenAI client. Constructing a client builds an HTTP connection
+    pool, so reusing one across reruns keeps connections warm instead of
+    paying TLS setup on every parse.
+    """
+    return OpenAI(api_key=_API_KEY)
+
 # TeamBuilders Cost Code Structure
 TEAMBUILDERS_COST_CODES = {
   "01 General Conditions": {
@@ -91,37 +115,250 @@ TEAMBUILDERS_COST_CODES = {
   }
 }
 
-def parse_scope(transcript: str) -> Dict:
+# Legal code values, enum-constrained in the output schema below: the
+# sampler's token mask then cannot produce a code that is not in the
+# table, so no validation retries and no prompt prose about legal codes
+_MAIN_CODE_VALUES = tuple(key.split(' ', 1)[0] for key in TEAMBUILDERS_COST_CODES)
+_SUB_CODE_VALUES = tuple(
+    sub_code
+    for subcodes in TEAMBUILDERS_COST_CODES.values()
+    for sub_code in subcodes
+) + ('',)
+
+# Response models: the OpenAI SDK derives a strict JSON schema from these,
+# so the output shape is enforced server-side at generation time and comes
+# back already parsed - no json.loads, no missing-key checks
+class ScopeItemDetails(BaseModel):
+    material: str
+    location: str
+    quantity: str
+    notes: str
+
+class ScopeItem(BaseModel):
+    # Matching guidance lives in the schema descriptions rather than prompt
+    # prose, so it rides the enforced schema instead of costing prompt
+    # tokens on every request
+    mainCode: Literal[_MAIN_CODE_VALUES] = Field(description=(
+        "Two-digit TeamBuilders division code, e.g. demolition=02, "
+        "framing=05, electrical=08, plumbing=09, drywall/paint=10, "
+        "flooring=13, roofing=19"
+    ))
+    subCode: Literal[_SUB_CODE_VALUES] = Field(description=(
+        "Most specific four-digit TeamBuilders subcode from the table, "
+        "or empty when only the division is clear"
+    ))
+    description: str
+    details: ScopeItemDetails
+
+class ProjectSummary(BaseModel):
+    overview: str
+    keyRequirements: List[str]
+    concerns: List[str]
+    decisionPoints: List[str]
+    importantNotes: List[str]
+    sentiment: str
+
+class ScopeResponse(BaseModel):
+    scopeItems: List[ScopeItem]
+    projectSummary: ProjectSummary
+
+class BatchScopeResult(BaseModel):
+    id: str
+    scopeItems: List[ScopeItem]
+    projectSummary: ProjectSummary
+
+class BatchScopeResponse(BaseModel):
+    results: List[BatchScopeResult]
+
+# Flat code lookup built once from the table above: _SUB_CODE_INFO
+# resolves a subcode to its division in one dict.get instead of scanning
+# the nested structure
+_SUB_CODE_INFO = {
+    sub_code: (key.split(' ', 1)[0], key.split(' ', 1)[1], sub_name)
+    for key, subcodes in TEAMBUILDERS_COST_CODES.items()
+    for sub_code, sub_name in subcodes.items()
+}
+
+# Division names indexed by int(main code): the codes are two digits in
+# 01-19, so an array index replaces a string hash + dict probe
+_CODE_TO_DIVISION = [None] * (max(int(k.split(' ', 1)[0]) for k in TEAMBUILDERS_COST_CODES) + 1)
+for _key in TEAMBUILDERS_COST_CODES:
+    _code, _name = _key.split(' ', 1)
+    _CODE_TO_DIVISION[int(_code)] = _name
+
+def _division_name(main_code: str) -> str:
+    """Resolve a two-digit main code to its division name ('' if unknown)."""
+    if main_code.isdigit():
+        index = int(main_code)
+        if index < len(_CODE_TO_DIVISION) and _CODE_TO_DIVISION[index]:
+            return _CODE_TO_DIVISION[index]
+    return ''
+
+# Transcripts with fewer words than this carry no parsable scope; the
+# model call would burn 2-5s and API spend to return an empty list
+_MIN_TRANSCRIPT_WORDS = 15
+
+# Transcripts longer than this (rough 4-chars-per-token heuristic; close
+# enough for a split decision without pulling in a tokenizer) are split on
+# paragraph boundaries and parsed concurrently
+_CHUNK_TOKEN_TARGET = 3500
+
+def _approx_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English)."""
+    return len(text) // 4
+
+def _split_transcript(transcript: str) -> List[str]:
     """
-    Parse transcript into scope items and a project summary using GPT-4.
-    
+    Split a transcript into chunks of roughly _CHUNK_TOKEN_TARGET tokens,
+    breaking only on paragraph (or sentence, as a fallback) boundaries so
+    no scope item is cut mid-description.
+    """
+    if _approx_tokens(transcript) <= _CHUNK_TOKEN_TARGET:
+        return [transcript]
+
+    paragraphs = transcript.split('\n\n')
+    if len(paragraphs) == 1:
+        paragraphs = transcript.split('. ')
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for paragraph in paragraphs:
+        paragraph_tokens = _approx_tokens(paragraph)
+        if current and current_tokens + paragraph_tokens > _CHUNK_TOKEN_TARGET:
+            chunks.append('\n\n'.join(current))
+            current = []
+            current_tokens = 0
+        current.append(paragraph)
+        current_tokens += paragraph_tokens
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+def _merge_chunk_results(results: List[Dict]) -> Dict:
+    """
+    Merge per-chunk parses into one result: concatenate scope items
+    (de-duplicated on sub code + description) and combine the summaries.
+    """
+    scope_items = []
+    seen = set()
+    for result in results:
+        for item in result.get('scopeItems', []):
+            key = (item.get('subCode', ''), item.get('description', '').strip().lower())
+            if key not in seen:
+                seen.add(key)
+                scope_items.append(item)
+
+    summaries = [r.get('projectSummary', {}) for r in results]
+    merged_summary = {
+        'overview': ' '.join(s.get('overview', '') for s in summaries if s.get('overview')),
+        'sentiment': summaries[0].get('sentiment', '') if summaries else ''
+    }
+    for key in ('keyRequirements', 'concerns', 'decisionPoints', 'importantNotes'):
+        merged = []
+        for summary in summaries:
+            for entry in summary.get(key, []):
+                if entry not in merged:
+                    merged.append(entry)
+        merged_summary[key] = merged
+
+    return {'scopeItems': scope_items, 'projectSummary': merged_summary}
+
+def merge_scope_results(results: List[Dict]) -> Dict:
+    """
+    Combine independently parsed results into one scope.
+
+    Public entry for callers that parse transcript chunks out-of-band
+    (e.g. pipelined with transcription) and need the same de-duplication
+    and summary merging the chunked parser applies.
+
     Args:
-        transcript: The transcribed text from the video/audio
-        
+        results: Parse results, each with 'scopeItems' and 'projectSummary'
+
     Returns:
-        Dict: A dictionary containing 'scopeItems' and 'projectSummary'
-        
-    Raises:
-        Exception: If parsing fails
+        Dict: A single merged {'scopeItems', 'projectSummary'} result
     """
-    try:
-        # Get OpenAI API key from environment
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY in your .env file.")
-        
-        # Set up OpenAI client
-        client = OpenAI(api_key=api_key)
-        
-        # Create the system prompt
-        system_prompt = f"""
+    if len(results) == 1:
+        return results[0]
+    return _merge_chunk_results(list(results))
+
+# Keywords that signal a division is relevant to a transcript, mirroring
+# the Key Matching Guidelines below. Pruning the cost-code table to the
+# divisions actually mentioned cuts most of the prompt's prefill tokens.
+_DIVISION_KEYWORDS = {
+    "01 General Conditions": ('permit', 'inspection', 'project management', 'oversight', 'equipment rental'),
+    "02 Site/Demo": ('demo', 'removal', 'dump', 'trash', 'dust protection', 'prep work'),
+    "03 Excavation/Landscape": ('landscap', 'excavat', 'grading'),
+    "04 Concrete/Masonry": ('concrete', 'footing', 'foundation', 'slab', 'masonry', 'flatwork'),
+    "05 Rough Carpentry": ('framing', 'stud', 'joist', 'rafter', 'truss', 'subfloor'),
+    "06 Doors/Windows": ('window', 'exterior door', 'entry door', 'patio door'),
+    "07 Mechanical": ('hvac', 'furnace', 'duct', 'air condition', 'heat pump'),
+    "08 Electrical": ('electric', 'wiring', 'outlet', 'breaker', 'panel'),
+    "09 Plumbing": ('plumb', 'water heater', 'faucet', 'toilet', 'sink', 'shower', 'drain'),
+    "10 Wall/Ceiling Coverings": ('insulation', 'drywall', 'sheetrock', 'paint', 'texture'),
+    "11 Finish Carpentry": ('interior door', 'trim', 'molding', 'baseboard', 'casing'),
+    "12 Cabinets/Vanities/Tops": ('cabinet', 'vanity', 'vanities', 'countertop', 'built-in'),
+    "13 Flooring/Tile": ('floor', 'tile', 'carpet', 'lvt', 'lvp', 'hardwood', 'vinyl plank'),
+    "14 Specialties": ('appliance', 'shelving', 'closet', 'mirror', 'specialty glass'),
+    "15 Decking": ('deck',),
+    "16 Fencing": ('fence', 'fencing'),
+    "17 Exterior Facade": ('siding', 'house wrap', 'facade'),
+    "18 Soffit/Fascia/Gutters": ('soffit', 'fascia', 'gutter'),
+    "19 Roofing": ('roof', 'shingle'),
+}
+
+def _relevant_divisions(transcript: str) -> tuple:
+    """
+    Pick the divisions whose keywords appear in the transcript. Falls back
+    to the full table when the scan matches almost nothing, so an unusual
+    transcript never loses access to a code.
+    """
+    lowered = transcript.lower()
+    matched = tuple(
+        division for division, keywords in _DIVISION_KEYWORDS.items()
+        if any(keyword in lowered for keyword in keywords)
+    )
+    if len(matched) < 3:
+        return tuple(TEAMBUILDERS_COST_CODES)
+    # General Conditions stays available for permits/management items
+    if "01 General Conditions" not in matched:
+        matched = ("01 General Conditions",) + matched
+    return tuple(sorted(matched))
+
+@lru_cache(maxsize=64)
+def _prompt_for_divisions(divisions: tuple) -> str:
+    """
+    Build the system prompt with only the given divisions' subcodes.
+
+    Each distinct division subset produces one frozen string, so repeat
+    transcripts about the same trades still present a byte-identical
+    prefix that the provider's prompt cache can reuse.
+
+    The table is rendered as one flat code=name line per entry rather than
+    indented JSON - the same information in roughly half the prompt tokens.
+    """
+    lines = []
+    for division in divisions:
+        main_code, name = division.split(' ', 1)
+        lines.append(f"{main_code}={name}")
+        for sub_code, sub_name in TEAMBUILDERS_COST_CODES[division].items():
+            lines.append(f"{main_code}.{sub_code}={sub_name}")
+    return _PROMPT_TEMPLATE.replace('__COST_CODES__', "\n".join(lines))
+
+# Static template; the cost-code table is the only varying part and even
+# that collapses to a handful of cached subsets via _prompt_for_divisions
+_PROMPT_TEMPLATE = """
 You are a highly accurate construction estimator working with structured data.
 Your output MUST be a valid JSON object ONLY, with no extra text, explanations, or commentary.
 
 You are an expert construction estimator specializing in TeamBuilders cost code classification. Analyze the following transcript from a job site video and extract scope items organized by TeamBuilders cost codes.
 
-TeamBuilders Cost Code Structure:
-{json.dumps(TEAMBUILDERS_COST_CODES, indent=2)}
+TeamBuilders Cost Code Structure (one "main=division" or
+"main.sub=name" entry per line):
+__COST_CODES__
+
+If work clearly doesn't fit any division listed above, use the closest main
+category code (01-19) with no subcode.
 
 Instructions:
 1. CAREFULLY analyze the transcript for construction activities, materials, and work being performed
@@ -136,102 +373,287 @@ Instructions:
 5. Be comprehensive - capture ALL construction-related items mentioned
 6. Do NOT invent or assume items not clearly stated or shown in the transcript
 
-Key Matching Guidelines:
-- Permits, inspections, project management → 01 General Conditions
-- Any demolition or removal work → 02 Site/Demo
-- Foundation, footings, slabs → 04 Concrete/Masonry
-- Framing (floor, wall, roof) → 05 Rough Carpentry
-- Door and window installation → 06 Doors/Windows
-- HVAC, furnace, ductwork → 07 Mechanical
-- Electrical wiring, fixtures, outlets → 08 Electrical
-- Plumbing pipes, fixtures, water heaters → 09 Plumbing
-- Insulation, drywall, painting → 10 Wall/Ceiling Coverings
-- Interior doors, trim, molding → 11 Finish Carpentry
-- Cabinets, countertops, vanities → 12 Cabinets/Vanities/Tops
-- Flooring materials (LVT, carpet, tile) → 13 Flooring/Tile
-- Appliances, mirrors, shelving → 14 Specialties
-- Deck construction → 15 Decking
-- Siding, house wrap → 17 Exterior Facade
-- Soffit, fascia, gutters → 18 Soffit/Fascia/Gutters
-- Roofing materials and work → 19 Roofing
-
-Return a JSON object with two main sections:
-
-{{
-  "scopeItems": [
-    {{
-      "mainCode": "05",
-      "mainCategory": "Rough Carpentry",
-      "subCode": "3100",
-      "subCategory": "Wall Framing",
-      "description": "Installing 2x6 wall studs for exterior walls on main level",
-      "details": {{
-        "material": "2x6x8 precut studs",
-        "location": "Main level exterior walls",
-        "quantity": "Not specified",
-        "notes": "Standard 16-inch on center spacing mentioned"
-      }}
-    }}
-  ],
-  "projectSummary": {{
-    "overview": "Brief 2-3 sentence summary of the overall project scope and current status",
-    "keyRequirements": [
-      "Important client preferences or must-haves mentioned",
-      "Special considerations or constraints",
-      "Quality expectations or specific brands/materials requested"
-    ],
-    "concerns": [
-      "Any worries, issues, or problems mentioned",
-      "Budget concerns or cost considerations",
-      "Timeline pressures or scheduling conflicts"
-    ],
-    "decisionPoints": [
-      "Items where client needs to make choices",
-      "Alternatives discussed",
-      "Trade-offs mentioned"
-    ],
-    "importantNotes": [
-      "Any other critical information that doesn't fit in categories above",
-      "Client personality insights or communication preferences",
-      "Relationships with other contractors or past experiences mentioned"
-    ],
-    "sentiment": "Overall tone/mood of the conversation (e.g., excited, concerned, frustrated, confident)"
-  }}
-}}
-
-IMPORTANT: Return ONLY the JSON object. No explanatory text before or after.
+Return a JSON object with two sections: "scopeItems" (one entry per scope
+item with its cost codes, description, and material/location/quantity/notes
+details - use "Not specified" where the transcript is silent) and
+"projectSummary" (overview, keyRequirements, concerns, decisionPoints,
+importantNotes, sentiment). The response schema is enforced; populate every
+field faithfully from the transcript.
+
+Output minified JSON only - no indentation, no newlines between fields.
+Keep descriptions and summary text tight; every extra token is waste.
+"""
+
+# Full-table prompt, kept for callers that want the unpruned prefix
+_SYSTEM_PROMPT = _prompt_for_divisions(tuple(TEAMBUILDERS_COST_CODES))
+
+# Appended after the shared prompt for batched parses, so the long static
+# prefix stays byte-identical to single parses and the provider's prompt
+# cache serves it either way
+_BATCH_SUFFIX = """
+The user message contains several independent transcripts as a JSON array
+of {"id", "text"} objects. Analyze each transcript separately and return
+one result per transcript under "results", echoing each transcript's id.
 """
 
-        user_prompt = f"Transcript to analyze:\n\n{transcript}"
+# Similarity cache: re-uploads and re-recordings of the same walkthrough
+# reuse the previous parse instead of paying another model call.
+# Embeddings come back unit-normalized, so the dot product is the cosine
+# similarity. The threshold is deliberately strict and every candidate
+# must also pass a lexical-overlap check: two *different* videos about
+# similar work (same contractor, two rooms) embed close together, and
+# silently returning the wrong job's scope would be worse than any
+# saved call. Hits are marked with fromCache=True so callers can see a
+# result was reused.
+_SIMILARITY_THRESHOLD = 0.97
+_LEXICAL_OVERLAP_MIN = 0.85
+_SIMILARITY_CACHE_MAX = 64
+_EMBED_MODEL = "text-embedding-3-small"
+_similarity_cache: List[tuple] = []  # [(embedding, word set, parsed result), ...]
+
+def _embed_transcript(client, transcript: str) -> List[float]:
+    """Embed the transcript (truncated - similarity only needs the gist)."""
+    response = client.embeddings.create(model=_EMBED_MODEL, input=transcript[:8000])
+    return response.data[0].embedding
+
+def _transcript_words(transcript: str) -> frozenset:
+    """Word set used to confirm embedding hits with lexical overlap."""
+    return frozenset(transcript.lower().split())
+
+def _similarity_lookup(embedding: List[float], words: frozenset):
+    """
+    Return the cached parse for the closest transcript, or None.
+
+    A hit must clear the cosine threshold AND share most of its
+    vocabulary with the cached transcript (Jaccard overlap), so only
+    genuine re-uploads qualify. Served results carry fromCache=True.
+    """
+    best = None
+    best_score = _SIMILARITY_THRESHOLD
+    for cached_embedding, cached_words, cached_result in _similarity_cache:
+        score = sum(a * b for a, b in zip(embedding, cached_embedding))
+        if score < best_score:
+            continue
+        union = len(words | cached_words)
+        if not union or len(words & cached_words) / union < _LEXICAL_OVERLAP_MIN:
+            continue
+        best_score = score
+        best = cached_result
+    if best is None:
+        return None
+    result = copy.deepcopy(best)
+    result['fromCache'] = True
+    return result
+
+def _similarity_store(embedding: List[float], words: frozenset, result: Dict):
+    """Remember a parse for future similarity hits (bounded, FIFO)."""
+    if len(_similarity_cache) >= _SIMILARITY_CACHE_MAX:
+        _similarity_cache.pop(0)
+    _similarity_cache.append((embedding, words, copy.deepcopy(result)))
+
+# Most scope lists fit comfortably in 1500 output tokens; the rare dense
+# transcript that overflows is retried once with the old 3000 cap rather
+# than failing the parse. The completion limit is gpt-4o-mini's hard cap.
+_MAX_OUTPUT_TOKENS = 1500
+_MAX_OUTPUT_TOKENS_RETRY = 3000
+_COMPLETION_TOKEN_LIMIT = 16384
+
+def _request_kwargs(transcript: str) -> Dict:
+    """Shared request parameters for the sync and async parse paths."""
+    return {
+        "model": _PARSE_MODEL,
+        "messages": [
+            {"role": "system", "content": _prompt_for_divisions(_relevant_divisions(transcript))},
+            {"role": "user", "content": f"Transcript to analyze:\n\n{transcript}"}
+        ],
+        "temperature": 0.1,
+        "max_tokens": _MAX_OUTPUT_TOKENS,
+        "response_format": ScopeResponse
+    }
+
+async def parse_scope_async(transcript: str) -> Dict:
+    """
+    Parse a long transcript by splitting it into chunks and issuing the
+    OpenAI requests concurrently, then merging the per-chunk results.
+
+    Wall time becomes roughly one chunk's latency instead of growing with
+    transcript length.
+    """
+    if not _API_KEY:
+        raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY in your .env file.")
+
+    chunks = _split_transcript(transcript)
+    client = AsyncOpenAI(api_key=_API_KEY)
+    try:
+        async def parse_chunk(chunk):
+            kwargs = _request_kwargs(chunk)
+            try:
+                response = await client.beta.chat.completions.parse(**kwargs)
+            except LengthFinishReasonError:
+                # Dense chunk overflowed the tight cap; retry with headroom
+                kwargs['max_tokens'] = _MAX_OUTPUT_TOKENS_RETRY
+                response = await client.beta.chat.completions.parse(**kwargs)
+            return response.choices[0].message.parsed.model_dump()
+
+        results = await asyncio.gather(*(parse_chunk(c) for c in chunks))
+    finally:
+        await client.close()
+
+    if len(results) == 1:
+        return results[0]
+    return _merge_chunk_results(list(results))
+
+def parse_scope(transcript: str, on_progress: Optional[Callable[[int], None]] = None) -> Dict:
+    """
+    Parse transcript into scope items and a project summary using GPT-4.
+    
+    Args:
+        transcript: The transcribed text from the video/audio
+        on_progress: Optional callback invoked with the number of scope
+            items completed so far while the response streams in
+        
+    Returns:
+        Dict: A dictionary containing 'scopeItems' and 'projectSummary';
+        results reused from the similarity cache also carry fromCache=True
+
+    Raises:
+        Exception: If parsing fails
+    """
+    try:
+        # A near-empty transcript (silent video, garbage upload) always
+        # parses to an empty scope - skip the API call and answer now
+        if len(transcript.split()) < _MIN_TRANSCRIPT_WORDS:
+            return {
+                'scopeItems': [],
+                'projectSummary': {
+                    'overview': 'Transcript too short to analyze.',
+                    'keyRequirements': [],
+                    'concerns': [],
+                    'decisionPoints': [],
+                    'importantNotes': [],
+                    'sentiment': 'Neutral'
+                }
+            }
+
+        if not _API_KEY:
+            raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY in your .env file.")
+
+        client = _get_client()
         
-        # Call API
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
+        # A cheap embedding call decides whether we have already parsed a
+        # near-identical transcript; on a miss it costs a few ms on top of
+        # the full model call it may save
+        embedding = None
+        words = frozenset()
+        try:
+            embedding = _embed_transcript(client, transcript)
+            words = _transcript_words(transcript)
+            cached = _similarity_lookup(embedding, words)
+            if cached is not None:
+                return cached
+        except Exception:
+            pass  # similarity cache is best-effort; fall through to a full parse
+        
+        # Long transcripts are chunked and parsed concurrently
+        if _approx_tokens(transcript) > _CHUNK_TOKEN_TARGET:
+            parsed = asyncio.run(parse_scope_async(transcript))
+            if embedding is not None:
+                _similarity_store(embedding, words, parsed)
+            return parsed
+        
+        # Call API, streaming so progress is visible from the first token
+        # instead of blocking until the full response arrives. The request
+        # parameters are shared with the async path, so the system message
+        # stays byte-identical everywhere and the provider can serve the
+        # static prefix from its prompt cache. Each scope item contributes
+        # exactly one "subCode" key, so counting them in the accumulated
+        # text tracks completed items without a streaming JSON parser.
+        try:
+            with client.beta.chat.completions.stream(**_request_kwargs(transcript)) as stream:
+                text_so_far = ""
+                items_seen = 0
+                for event in stream:
+                    if event.type == "content.delta" and on_progress:
+                        text_so_far += event.delta
+                        count = text_so_far.count('"subCode"')
+                        if count > items_seen:
+                            items_seen = count
+                            on_progress(items_seen)
+                response = stream.get_final_completion()
+        except LengthFinishReasonError:
+            # A dense transcript overflowed the tight output cap; retry
+            # once with headroom instead of failing valid input
+            kwargs = _request_kwargs(transcript)
+            kwargs['max_tokens'] = _MAX_OUTPUT_TOKENS_RETRY
+            response = client.beta.chat.completions.parse(**kwargs)
+        parsed = response.choices[0].message.parsed.model_dump()
+        
+        if embedding is not None:
+            _similarity_store(embedding, words, parsed)
+        return parsed
+            
+    except Exception as e:
+        raise Exception(f"Scope parsing failed: {str(e)}")
+
+def parse_scopes_batch(transcripts: List[str]) -> List[Dict]:
+    """
+    Parse several short transcripts in one API call.
+
+    All transcripts ride a single prompt prefill, so a set of N small jobs
+    costs one round-trip instead of N. Results come back in input order.
+
+    Args:
+        transcripts: The transcribed texts, one per job
+
+    Returns:
+        List[Dict]: One {'scopeItems', 'projectSummary'} dict per transcript
+
+    Raises:
+        Exception: If parsing fails
+    """
+    if not transcripts:
+        return []
+    try:
+        if not _API_KEY:
+            raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY in your .env file.")
+
+        payload = orjson.dumps({
+            "transcripts": [
+                {"id": str(index), "text": transcript}
+                for index, transcript in enumerate(transcripts)
+            ]
+        }).decode()
+        system_prompt = _prompt_for_divisions(
+            _relevant_divisions("\n\n".join(transcripts))
+        ) + _BATCH_SUFFIX
+
+        client = _get_client()
+        response = client.beta.chat.completions.parse(
+            model=_PARSE_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
+                {"role": "user", "content": f"Transcripts to analyze:\n\n{payload}"}
             ],
             temperature=0.1,
-            max_tokens=3000,
-            response_format={"type": "json_object"} # Enforce JSON mode
+            max_tokens=min(_MAX_OUTPUT_TOKENS * len(transcripts), _COMPLETION_TOKEN_LIMIT),
+            response_format=BatchScopeResponse
         )
-        
-        # Extract and parse response
-        response_text = response.choices[0].message.content.strip()
-        try:
-            parsed_data = json.loads(response_text)
-            
-            # Validate the new structure
-            if not isinstance(parsed_data, dict) or 'scopeItems' not in parsed_data or 'projectSummary' not in parsed_data:
-                raise ValueError("Response is not a valid dictionary with 'scopeItems' and 'projectSummary' keys")
-            
-            return parsed_data
-            
-        except json.JSONDecodeError as e:
-            raise Exception(f"Failed to parse GPT-4 response as JSON: {str(e)}\nResponse: {response_text}")
-            
+        results = response.choices[0].message.parsed.results
+
+        # Return in input order; a missing id yields an empty result rather
+        # than shifting every transcript after it
+        by_id = {result.id: result for result in results}
+        empty = {'scopeItems': [], 'projectSummary': {}}
+        return [
+            {
+                'scopeItems': [item.model_dump() for item in result.scopeItems],
+                'projectSummary': result.projectSummary.model_dump()
+            } if (result := by_id.get(str(index))) else dict(empty)
+            for index in range(len(transcripts))
+        ]
+
     except Exception as e:
-        raise Exception(f"Scope parsing failed: {str(e)}")
+        raise Exception(f"Batch scope parsing failed: {str(e)}")
 
 def format_scope_items_for_display(scope_items: List[Dict[str, str]]) -> List[Dict[str, str]]:
     """
@@ -243,22 +665,54 @@ def format_scope_items_for_display(scope_items: List[Dict[str, str]]) -> List[Di
     Returns:
         List[Dict[str, str]]: Formatted items with TeamBuilders structure
     """
-    formatted_items = []
-    
-    for item in scope_items:
-        formatted_items.append({
-            'Main Code': item.get('mainCode', ''),
-            'Main Category': item.get('mainCategory', ''),
-            'Sub Code': item.get('subCode', ''),
-            'Sub Category': item.get('subCategory', ''),
+    def format_one(item):
+        # Category names are deterministic functions of the codes, so the
+        # model outputs codes only and the names come from one dict lookup
+        main_code = item.get('mainCode', '')
+        sub_code = item.get('subCode', '')
+        info = _SUB_CODE_INFO.get(sub_code)
+        details = item.get('details', {})
+        # When the sub code is known it decides the division outright, so a
+        # mismatched mainCode can never produce a pair like "09 / Electrical"
+        return {
+            'Main Code': info[0] if info else main_code,
+            'Main Category': info[1] if info else _division_name(main_code),
+            'Sub Code': sub_code,
+            'Sub Category': info[2] if info else '',
             'Description': item.get('description', ''),
-            'Material': item.get('details', {}).get('material', ''),
-            'Location': item.get('details', {}).get('location', ''),
-            'Quantity': item.get('details', {}).get('quantity', ''),
-            'Notes': item.get('details', {}).get('notes', '')
-        })
+            'Material': details.get('material', ''),
+            'Location': details.get('location', ''),
+            'Quantity': details.get('quantity', ''),
+            'Notes': details.get('notes', '')
+        }
     
-    # Sort by main code, then sub code
-    formatted_items.sort(key=lambda x: (x['Main Code'], x['Sub Code']))
+    formatted_items = [format_one(item) for item in scope_items]
     
-    return formatted_items 
\ No newline at end of file
+    # Sort by main code, then sub code (C-level key extraction)
+    formatted_items.sort(key=itemgetter('Main Code', 'Sub Code'))
+    
+    return formatted_items
+
+_DISPLAY_COLUMNS = ('Main Code', 'Main Category', 'Sub Code', 'Sub Category',
+                    'Description', 'Material', 'Location', 'Quantity', 'Notes')
+
+def scope_items_to_dataframe(formatted_items: List[Dict[str, str]]) -> pd.DataFrame:
+    """
+    Build a pandas DataFrame from formatted scope items for display.
+    
+    Streamlit renders DataFrames faster than a list of dicts (one Arrow
+    conversion instead of per-row inference), and the column-wise
+    construction plus vectorized stable sort avoids a Python-level key
+    call per row.
+    
+    Args:
+        formatted_items: Items from format_scope_items_for_display()
+        
+    Returns:
+        pd.DataFrame: One row per scope item, sorted by code
+    """
+    df = pd.DataFrame({
+        column: [item.get(column, '') for item in formatted_items]
+        for column in _DISPLAY_COLUMNS
+    })
+    return df.sort_values(['Main Code', 'Sub Code'], kind='mergesort').reset_index(drop=True)
\ No newline at end of file
@@ -1,14 +1,20 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
+import hashlib
+import json
+import shutil
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import datetime
 from typing import List, Dict
 import traceback
 
 # Import our custom modules
 from transcribe import transcribe_video, validate_file_duration
-from parse_scope import parse_scope, format_scope_items_for_display
+from parse_scope import parse_scope, merge_scope_results, format_scope_items_for_display, scope_items_to_dataframe
 from doc_generator import generate_docx, generate_pdf_from_scope_items
 
 # Load environment variables
@@ -28,6 +34,8 @@ if 'transcript' not in st.session_state:
     st.session_state.transcript = ""
 if 'scope_items' not in st.session_state:
     st.session_state.scope_items = []
+if 'scope_df' not in st.session_state:
+    st.session_state.scope_df = None
 if 'project_summary' not in st.session_state:
     st.session_state.project_summary = None
 if 'docx_path' not in st.session_state:
@@ -36,6 +44,8 @@ if 'pdf_path' not in st.session_state:
     st.session_state.pdf_path = ""
 if 'processing_complete' not in st.session_state:
     st.session_state.processing_complete = False
+if 'progress' not in st.session_state:
+    st.session_state.progress = None
 
 def validate_api_keys():
     """Check if required API keys are configured."""
@@ -52,104 +62,231 @@ def reset_session_state():
     st.session_state.uploaded_file = None
     st.session_state.transcript = ""
     st.session_state.scope_items = []
+    st.session_state.scope_df = None
     st.session_state.project_summary = None
     st.session_state.docx_path = ""
     st.session_state.pdf_path = ""
     st.session_state.processing_complete = False
+    st.session_state.progress = None
+
+# Pipeline results are a pure function of the file bytes, so cache them on
+# disk keyed by content hash - re-processing an identical file is instant
+CACHE_ROOT = ".cache"
+_CACHE_FILES = ('transcript.txt', 'scope.json', 'scope.docx', 'scope.pdf')
+
+def _content_digest(file_path: str) -> str:
+    """Compute a streaming SHA-256 of the file without loading it whole."""
+    with open(file_path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+def _load_cached_results(cache_dir: str) -> bool:
+    """Restore session state from a previous run of identical file bytes."""
+    try:
+        if not all(os.path.exists(os.path.join(cache_dir, name)) for name in _CACHE_FILES):
+            return False
+
+        with open(os.path.join(cache_dir, 'transcript.txt'), 'r', encoding='utf-8') as f:
+            st.session_state.transcript = f.read()
+        with open(os.path.join(cache_dir, 'scope.json'), 'r', encoding='utf-8') as f:
+            scope_data = json.load(f)
+
+        st.session_state.scope_items = scope_data.get('scopeItems', [])
+        st.session_state.scope_df = scope_items_to_dataframe(st.session_state.scope_items)
+        st.session_state.project_summary = scope_data.get('projectSummary', {})
+        st.session_state.docx_path = os.path.join(cache_dir, 'scope.docx')
+        st.session_state.pdf_path = os.path.join(cache_dir, 'scope.pdf')
+        st.session_state.processing_complete = True
+        return True
+    except Exception:
+        # A damaged cache entry should never block processing
+        return False
+
+def _store_cached_results(cache_dir: str):
+    """Persist the finished pipeline outputs for this content digest."""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(os.path.join(cache_dir, 'transcript.txt'), 'w', encoding='utf-8') as f:
+            f.write(st.session_state.transcript)
+        with open(os.path.join(cache_dir, 'scope.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'scopeItems': st.session_state.scope_items,
+                'projectSummary': st.session_state.project_summary,
+            }, f)
+        shutil.copyfile(st.session_state.docx_path, os.path.join(cache_dir, 'scope.docx'))
+        shutil.copyfile(st.session_state.pdf_path, os.path.join(cache_dir, 'scope.pdf'))
+    except Exception as e:
+        # Caching is best-effort; a failed write only costs the next re-run
+        st.warning(f"Could not cache results: {e}")
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _load_bytes(path: str, mtime: float) -> bytes:
+    """
+    Read a generated document once per (path, mtime). Streamlit reruns
+    the script on every widget interaction; without this the DOCX and
+    PDF were re-read from disk on each rerun just to feed the download
+    buttons.
+    """
+    with open(path, 'rb') as f:
+        return f.read()
+
+@st.cache_data(show_spinner=False, max_entries=32, ttl=86400)
+def _cached_transcribe(digest: str, _file_path: str, _filename: str, _on_chunk=None) -> str:
+    """
+    Whisper result memoized per content digest. The path, filename, and
+    chunk callback are underscore-prefixed so Streamlit keys the cache on
+    the digest alone - the same bytes under a new temp name still hit.
+    """
+    return transcribe_video(_file_path, _filename, on_chunk=_on_chunk)
+
+@st.cache_data(show_spinner=False, max_entries=32, ttl=86400)
+def _cached_parse(transcript: str, _on_progress=None) -> dict:
+    """Parse result memoized on the transcript text (callback excluded)."""
+    return parse_scope(transcript, on_progress=_on_progress)
+
+def _update_progress(stage: str, pct: int, done: bool = False, error: str = None):
+    """Publish pipeline progress for the polling fragment to render."""
+    st.session_state.progress = {'stage': stage, 'pct': pct, 'done': done, 'error': error}
+
+def _start_processing():
+    """
+    Run process_video on a daemon thread so the script run returns at
+    once and the UI stays responsive; the progress fragment polls shared
+    session state instead of blocking on the pipeline.
+    """
+    _update_progress('🚀 Starting...', 0)
+    thread = threading.Thread(target=process_video, daemon=True)
+    add_script_run_ctx(thread)
+    thread.start()
+
+@st.fragment(run_every=0.5)
+def _render_progress():
+    """Redraw only this block twice a second while the pipeline runs."""
+    progress = st.session_state.progress or {}
+    if progress.get('done'):
+        # Full rerun so the transcript, scope table, and downloads render
+        st.rerun()
+    st.progress(progress.get('pct', 0), text=progress.get('stage', ''))
 
 def process_video():
     """Main processing function that orchestrates the entire pipeline."""
     if not st.session_state.uploaded_file:
-        st.error("No file uploaded")
+        _update_progress('No file uploaded', 0, done=True, error='No file uploaded')
         return
     
     # Get file details
     uploaded_file = st.session_state.uploaded_file
-    file_bytes = uploaded_file.read()
     filename = uploaded_file.name
     job_name = os.path.splitext(filename)[0]
-    
-    # Progress indicators
-    upload_progress = st.progress(0)
-    upload_status = st.empty()
-    
-    transcription_progress = st.progress(0)
-    transcription_status = st.empty()
-    
-    parsing_progress = st.progress(0)
-    parsing_status = st.empty()
-    
-    generation_progress = st.progress(0)
-    generation_status = st.empty()
-    
+
+    # Spill the upload to disk in 8MB chunks instead of materializing the
+    # whole file in memory; every pipeline stage works from this path
+    file_extension = os.path.splitext(filename)[1].lower() or '.mp4'
+    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
+        shutil.copyfileobj(uploaded_file, temp_file, length=8 * 1024 * 1024)
+        file_path = temp_file.name
+
+    # Check the content-addressed cache before doing any work
+    digest = _content_digest(file_path)
+    cache_dir = os.path.join(CACHE_ROOT, digest)
+    if _load_cached_results(cache_dir):
+        os.unlink(file_path)
+        _update_progress('🎉 Found previous results for this file! Your documents are ready for download.', 100, done=True)
+        return
+
     try:
         # Step 1: Validate file
-        upload_status.info("📋 Validating file...")
-        upload_progress.progress(25)
-        
+        _update_progress('📋 Validating file...', 5)
+
         # Check file duration if possible
-        is_valid, duration_msg = validate_file_duration(file_bytes, filename)
+        is_valid, duration_msg = validate_file_duration(file_path, filename)
         if not is_valid:
-            st.warning(f"⚠️ {duration_msg}")
-        
-        upload_progress.progress(100)
-        upload_status.success("✅ File validated successfully")
-        
-        # Step 2: Transcription
-        transcription_status.info("🎤 Transcribing audio...")
-        transcription_progress.progress(25)
-        
-        transcript = transcribe_video(file_bytes, filename)
-        st.session_state.transcript = transcript
-        
-        transcription_progress.progress(100)
-        transcription_status.success("✅ Transcription completed")
-        
-        # Step 3: Parsing
-        parsing_status.info("🔍 Extracting scope items & summary...")
-        parsing_progress.progress(25)
-        
-        parsed_data = parse_scope(transcript)
+            _update_progress(f"⚠️ {duration_msg}", 10)
+
+
+        # Steps 2+3: transcription and parsing overlap as a producer-
+        # consumer pipeline - each transcript chunk is parsed while later
+        # chunks are still transcribing, so long recordings pay roughly
+        # the slower stage instead of the stages' sum
+        _update_progress('🎤 Transcribing audio...', 15)
+
+        ctx = get_script_run_ctx()
+        with ThreadPoolExecutor(
+            max_workers=2,
+            initializer=lambda: add_script_run_ctx(ctx=ctx)
+        ) as parse_pool:
+            chunk_parses = []
+            transcript = _cached_transcribe(
+                digest, file_path, filename,
+                _on_chunk=lambda text: chunk_parses.append(
+                    parse_pool.submit(_cached_parse, text)
+                )
+            )
+            st.session_state.transcript = transcript
+
+            _update_progress('🔍 Extracting scope items & summary...', 50)
+
+            if chunk_parses:
+                # Chunk parses were queued during transcription; collect
+                # and merge them (order does not matter - the merge
+                # de-duplicates and combines summaries)
+                parsed_data = merge_scope_results(
+                    [future.result() for future in chunk_parses]
+                )
+            else:
+                parsed_data = _cached_parse(
+                    transcript,
+                    _on_progress=lambda n: _update_progress(
+                        f"🔍 Extracting scope items & summary... {n} item{'s' if n != 1 else ''} so far", 60
+                    )
+                )
         raw_scope_items = parsed_data.get('scopeItems', [])
         project_summary = parsed_data.get('projectSummary', {})
         
         formatted_scope_items = format_scope_items_for_display(raw_scope_items)
         st.session_state.scope_items = formatted_scope_items
+        # Build the Arrow-backed frame once here; reruns then hand Streamlit
+        # a ready DataFrame instead of re-converting the list of dicts
+        st.session_state.scope_df = scope_items_to_dataframe(formatted_scope_items)
         st.session_state.project_summary = project_summary
         
-        parsing_progress.progress(100)
-        parsing_status.success(f"✅ Extracted {len(raw_scope_items)} scope items")
-        
         # Step 4: Document generation
-        generation_status.info("📄 Generating documents...")
-        generation_progress.progress(25)
-        
-        # Generate DOCX and PDF using both scope items and the project summary
-        docx_path = generate_docx(formatted_scope_items, st.session_state.project_summary, job_name, version=1)
-        st.session_state.docx_path = docx_path
-        generation_progress.progress(50)
-        
-        pdf_path = generate_pdf_from_scope_items(formatted_scope_items, st.session_state.project_summary, job_name, version=1)
-        st.session_state.pdf_path = pdf_path
-        generation_progress.progress(100)
-        generation_status.success("✅ Documents generated and ready for download")
-        
+        _update_progress(f"📄 Extracted {len(raw_scope_items)} scope items - generating documents...", 75)
+
+
+        # Generate DOCX and PDF concurrently - the two documents are
+        # independent and most of their time is spent in file I/O. The
+        # workers get this run's script context so the st.* calls inside
+        # the generators render instead of raising missing-ScriptContext
+        ctx = get_script_run_ctx()
+        with ThreadPoolExecutor(
+            max_workers=2,
+            initializer=lambda: add_script_run_ctx(ctx=ctx)
+        ) as doc_pool:
+            docx_future = doc_pool.submit(
+                generate_docx, formatted_scope_items, st.session_state.project_summary, job_name, version=1
+            )
+            pdf_future = doc_pool.submit(
+                generate_pdf_from_scope_items, formatted_scope_items, st.session_state.project_summary, job_name, version=1
+            )
+            st.session_state.docx_path = docx_future.result()
+            _update_progress('📄 Generating documents...', 90)
+            st.session_state.pdf_path = pdf_future.result()
+
         # Mark processing as complete
         st.session_state.processing_complete = True
-        
-        # Show success message
-        st.success("🎉 Processing completed successfully! Your documents are ready for download.")
-        st.balloons()
+
+        # Populate the cache so re-processing the same bytes is instant
+        _store_cached_results(cache_dir)
+
+        _update_progress('🎉 Processing completed successfully! Your documents are ready for download.', 100, done=True)
         
     except Exception as e:
-        st.error(f"❌ An error occurred: {str(e)}")
-        with st.expander("Show error details"):
-            st.code(traceback.format_exc())
-        
-        # Offer reset button on error
-        if st.button("🔄 Reset and Try Again"):
-            reset_session_state()
-            st.rerun()
+        _update_progress(f"❌ An error occurred: {str(e)}", 0, done=True, error=traceback.format_exc())
+
+    finally:
+        # The spilled upload is no longer needed once processing finishes
+        if os.path.exists(file_path):
+            os.unlink(file_path)
 
 def main():
     st.title("🎥 Video-to-Scope-Summary")
@@ -254,10 +391,28 @@ def main():
             # Processing section
             st.header("🔄 Processing")
             
-            # Start processing button
-            if st.button("🚀 Start Processing", disabled=st.session_state.processing_complete):
-                process_video()
-            
+            progress = st.session_state.progress
+            processing_active = bool(progress) and not progress.get('done')
+
+            # Start processing button; the pipeline runs on a background
+            # thread so this run returns immediately
+            if st.button("🚀 Start Processing",
+                         disabled=st.session_state.processing_complete or processing_active):
+                _start_processing()
+                st.rerun()
+
+            if processing_active:
+                _render_progress()
+            elif progress and progress.get('error'):
+                st.error(progress['stage'])
+                with st.expander("Show error details"):
+                    st.code(progress['error'])
+                if st.button("🔄 Reset and Try Again"):
+                    reset_session_state()
+                    st.rerun()
+            elif progress and progress.get('done'):
+                st.success(progress['stage'])
+
             # Reset button
             if st.session_state.processing_complete:
                 if st.button("🔄 Process Another File"):
@@ -322,8 +477,8 @@ def main():
             st.info("Project summary will appear here after parsing")
         
         st.header("📊 Scope Items")
-        if st.session_state.scope_items:
-            st.dataframe(st.session_state.scope_items, use_container_width=True)
+        if st.session_state.scope_df is not None:
+            st.dataframe(st.session_state.scope_df, use_container_width=True)
         else:
             st.info("Scope items will appear here after parsing")
         
@@ -334,25 +489,25 @@ def main():
         
         with col_docx:
             if st.session_state.docx_path and os.path.exists(st.session_state.docx_path):
-                with open(st.session_state.docx_path, "rb") as file:
-                    st.download_button(
-                        label="📄 Download DOCX",
-                        data=file.read(),
-                        file_name=f"scope_summary_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.docx",
-                        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
+                docx_path = st.session_state.docx_path
+                st.download_button(
+                    label="📄 Download DOCX",
+                    data=_load_bytes(docx_path, os.path.getmtime(docx_path)),
+                    file_name=f"scope_summary_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.docx",
+                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                )
             else:
                 st.button("📄 Download DOCX", disabled=True)
         
         with col_pdf:
             if st.session_state.pdf_path and os.path.exists(st.session_state.pdf_path):
-                with open(st.session_state.pdf_path, "rb") as file:
-                    st.download_button(
-                        label="📄 Download PDF",
-                        data=file.read(),
-                        file_name=f"scope_summary_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                        mime="application/pdf"
-                    )
+                pdf_path = st.session_state.pdf_path
+                st.download_button(
+                    label="📄 Download PDF",
+                    data=_load_bytes(pdf_path, os.path.getmtime(pdf_path)),
+                    file_name=f"scope_summary_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                    mime="application/pdf"
+                )
             else:
                 st.button("📄 Download PDF", disabled=True)
 
@@ -1,14 +1,72 @@
+import asyncio
 import os
+import shutil
 import tempfile
-from typing import BinaryIO
+from functools import lru_cache
+from typing import Callable, List, Optional
+import httpx
 import streamlit as st
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 import ffmpeg
 
 # Load environment variables
 load_dotenv()
 
+# Recordings longer than this are split at fixed boundaries and the
+# chunks transcribed in parallel; ~5 minutes of 32kbps mono MP3 is about
+# 1.2MB, comfortably under the Whisper size limit
+_CHUNK_SECONDS = 300
+
+# In-flight Whisper uploads per transcription; caps pressure on the API
+# rate limit while keeping the pipe full
+_ASYNC_CONCURRENCY = 10
+
+# Uploads with these extensions are already audio-only; anything else is
+# assumed to carry a video stream Whisper would ignore
+_AUDIO_EXTENSIONS = frozenset({'.mp3', '.m4a', '.wav', '.mpga', '.flac', '.oga', '.ogg'})
+
+# Generous total timeout for large uploads, quick connect failure, and
+# SDK-level retries to absorb 429s across the many chunk calls
+_CLIENT_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+_CLIENT_MAX_RETRIES = 5
+
+
+@lru_cache(maxsize=1)
+def _get_client() -> OpenAI:
+    """
+    Shared Whisper client. One client keeps its httpx connection pool
+    alive across calls, skipping a TLS handshake per chunk upload.
+    """
+    return OpenAI(
+        api_key=os.getenv('OPENAI_API_KEY'),
+        timeout=_CLIENT_TIMEOUT,
+        max_retries=_CLIENT_MAX_RETRIES
+    )
+
+@lru_cache(maxsize=32)
+def probe_duration(file_path: str) -> float:
+    """
+    Read the media duration in seconds from container metadata.
+
+    ffprobe only parses the header (moov atom / ID3 tag), so this costs
+    the same for a 5MB clip and a 500MB video - no full-file read. The
+    result is memoized per path: validation and transcription probe the
+    same tempfile, and the second call is a dict hit (temp names are
+    unique, so entries never go stale).
+
+    Args:
+        file_path: Path to the media file
+
+    Returns:
+        float: Duration in seconds
+
+    Raises:
+        Exception: If the container metadata cannot be read
+    """
+    probe = ffmpeg.probe(file_path)
+    return float(probe['format']['duration'])
+
 def compress_audio_for_whisper(input_path: str, max_size_mb: int = 24) -> str:
     """
     Compress audio/video file to meet Whisper API size requirements.
@@ -26,8 +84,7 @@ def compress_audio_for_whisper(input_path: str, max_size_mb: int = 24) -> str:
         output_path = input_path.replace('.mp4', '_compressed.mp3').replace('.mp3', '_compressed.mp3')
         
         # Get file info
-        probe = ffmpeg.probe(input_path)
-        duration = float(probe['streams'][0]['duration'])
+        duration = probe_duration(input_path)
         
         # Calculate target bitrate (in kbps) to achieve target file size
         # Formula: (target_size_mb * 8 * 1024) / duration_seconds
@@ -94,23 +151,140 @@ def compress_audio_for_whisper(input_path: str, max_size_mb: int = 24) -> str:
     except Exception as e:
         raise Exception(f"Audio compression failed: {str(e)}")
 
-def convert_mov_to_mp4(file_bytes: bytes, filename: str) -> bytes:
+def _split_audio(file_path: str, chunk_seconds: int = _CHUNK_SECONDS) -> List[str]:
+    """
+    Split a media file into fixed-length 16kHz mono MP3 chunks.
+
+    A single ffmpeg pass decodes the audio, drops any video stream, and
+    writes numbered segment files ready for parallel Whisper uploads.
+
+    Args:
+        file_path: Path to the input media file
+        chunk_seconds: Length of each segment in seconds
+
+    Returns:
+        List[str]: Paths of the chunk files in playback order (the caller
+            owns the containing directory and should remove it when done)
+    """
+    chunk_dir = tempfile.mkdtemp(prefix='whisper_chunks_')
+    (
+        ffmpeg
+        .input(file_path)
+        .output(
+            os.path.join(chunk_dir, 'chunk_%03d.mp3'),
+            f='segment',
+            segment_time=chunk_seconds,
+            acodec='mp3',
+            audio_bitrate='32k',
+            ac=1,
+            ar=16000,
+            vn=None
+        )
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    return sorted(os.path.join(chunk_dir, name) for name in os.listdir(chunk_dir))
+
+def _extract_audio(file_path: str) -> str:
+    """
+    Extract the audio track as 16kHz mono 32kbps MP3.
+
+    Whisper never looks at the video stream, so uploading raw MP4 bytes
+    wastes 50-100x the bandwidth; one ffmpeg pass reduces the upload to
+    speech-grade audio.
+
+    Args:
+        file_path: Path to the input media file
+
+    Returns:
+        str: Path to the extracted MP3 (caller is responsible for cleanup)
+    """
+    output_path = os.path.splitext(file_path)[0] + '_audio.mp3'
+    (
+        ffmpeg
+        .input(file_path)
+        .output(
+            output_path,
+            acodec='mp3',
+            audio_bitrate='32k',
+            ac=1,
+            ar=16000,
+            vn=None
+        )
+        .overwrite_output()
+        .run(quiet=True)
+    )
+    return output_path
+
+def _transcribe_chunk(client: OpenAI, chunk_path: str) -> str:
+    """Send one audio file to Whisper and return its transcript text."""
+    with open(chunk_path, 'rb') as audio_file:
+        return client.audio.transcriptions.create(
+            model="whisper-1",
+            file=audio_file,
+            response_format="text"
+        )
+
+async def _transcribe_chunks_async(
+    chunk_paths: List[str],
+    on_chunk: Optional[Callable[[str], None]] = None
+) -> List[str]:
+    """
+    Upload all chunks concurrently on a single event loop.
+
+    Each Whisper call is tens of seconds of pure network wait, so one
+    event loop with a semaphore replaces an OS thread per in-flight
+    upload and scales to the rate limit without context switching.
+
+    Args:
+        chunk_paths: Chunk files in playback order
+        on_chunk: Optional callback invoked with each chunk's transcript
+            as soon as it completes (completion order, not playback order)
+
+    Returns:
+        List[str]: Transcript text per chunk, in input order
+    """
+    client = AsyncOpenAI(
+        api_key=os.getenv('OPENAI_API_KEY'),
+        timeout=_CLIENT_TIMEOUT,
+        max_retries=_CLIENT_MAX_RETRIES
+    )
+    semaphore = asyncio.Semaphore(_ASYNC_CONCURRENCY)
+    try:
+        async def transcribe_one(chunk_path):
+            async with semaphore:
+                with open(chunk_path, 'rb') as audio_file:
+                    text = await client.audio.transcriptions.create(
+                        model="whisper-1",
+                        file=audio_file,
+                        response_format="text"
+                    )
+            if on_chunk:
+                on_chunk(text)
+            return text
+
+        return list(await asyncio.gather(
+            *(transcribe_one(chunk_path) for chunk_path in chunk_paths)
+        ))
+    finally:
+        await client.close()
+
+def convert_mov_to_mp4(file_path: str, filename: str) -> str:
     """
     Convert MOV file to MP4 format using FFmpeg.
-    
+
     Args:
-        file_bytes: The MOV file as bytes
+        file_path: Path to the MOV file on disk
         filename: Original filename
-        
+
     Returns:
-        bytes: The converted MP4 file as bytes
-        
+        str: Path to the converted MP4 file (caller is responsible for cleanup)
+
     Raises:
         Exception: If conversion fails
     """
-    temp_mov_path = None
     temp_mp4_path = None
-    
+
     try:
         st.info("🔧 Starting MOV to MP4 conversion...")
         
@@ -126,21 +300,12 @@ def convert_mov_to_mp4(file_bytes: bytes, filename: str) -> bytes:
             st.error(error_msg)
             raise Exception(error_msg)
         
-        # Create temporary files with better error handling
-        try:
-            with tempfile.NamedTemporaryFile(suffix='.mov', delete=False) as temp_mov:
-                temp_mov.write(file_bytes)
-                temp_mov_path = temp_mov.name
-            st.info(f"📁 Created temporary MOV file: {os.path.basename(temp_mov_path)}")
-        except Exception as e:
-            raise Exception(f"Failed to create temporary MOV file: {str(e)}")
-            
-        temp_mp4_path = temp_mov_path.replace('.mov', '.mp4')
-        
+        temp_mp4_path = os.path.splitext(file_path)[0] + '.mp4'
+
         # Convert using FFmpeg with detailed error handling
         try:
             st.info("🔄 Running FFmpeg conversion...")
-            stream = ffmpeg.input(temp_mov_path)
+            stream = ffmpeg.input(file_path)
             stream = ffmpeg.output(
                 stream, 
                 temp_mp4_path, 
@@ -182,21 +347,11 @@ def convert_mov_to_mp4(file_bytes: bytes, filename: str) -> bytes:
             raise Exception("Conversion failed - output MP4 file is empty")
         
         st.info(f"📊 Converted MP4 size: {file_size / (1024*1024):.1f} MB")
-        
-        # Read the converted file
-        try:
-            with open(temp_mp4_path, 'rb') as f:
-                converted_bytes = f.read()
-                
-            if len(converted_bytes) == 0:
-                raise Exception("Failed to read converted MP4 file")
-                
-            st.success(f"✅ MOV successfully converted to MP4 ({len(converted_bytes) / (1024*1024):.1f} MB)")
-            return converted_bytes
-            
-        except Exception as e:
-            raise Exception(f"Failed to read converted file: {str(e)}")
-        
+
+        st.success(f"✅ MOV successfully converted to MP4 ({file_size / (1024*1024):.1f} MB)")
+        return temp_mp4_path
+
+
     except Exception as e:
         error_msg = f"MOV to MP4 conversion failed: {str(e)}"
         st.error(error_msg)
@@ -206,7 +361,7 @@ def convert_mov_to_mp4(file_bytes: bytes, filename: str) -> bytes:
             st.code(f"""
 Error Details: {str(e)}
 Original file: {filename}
-File size: {len(file_bytes) / (1024*1024):.1f} MB
+File size: {os.path.getsize(file_path) / (1024*1024):.1f} MB
 
 Possible solutions:
 1. Try converting the MOV to MP4 on your computer first
@@ -219,30 +374,47 @@ Server Environment Issues:
 - Different codec support than local environment
 - Memory or disk space limitations
             """)
-        
+
+        # Clean up the partial output; the caller owns the input file
+        if temp_mp4_path and os.path.exists(temp_mp4_path):
+            try:
+                os.unlink(temp_mp4_path)
+            except Exception as cleanup_error:
+                st.warning(f"Could not clean up temp file {temp_mp4_path}: {cleanup_error}")
+                pass  # Don't fail the whole process for cleanup issues
+
         raise Exception(error_msg)
-        
-    finally:
-        # Clean up temporary files with better error handling
-        for temp_path in [temp_mov_path, temp_mp4_path]:
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                except Exception as cleanup_error:
-                    st.warning(f"Could not clean up temp file {temp_path}: {cleanup_error}")
-                    pass  # Don't fail the whole process for cleanup issues
-
-def transcribe_video(file_bytes: bytes, filename: str) -> str:
+
+def transcribe_video(
+    file_path: str,
+    filename: str,
+    on_chunk: Optional[Callable[[str], None]] = None
+) -> str:
     """
     Transcribe video/audio to text using OpenAI Whisper.
     Automatically converts MOV files to MP4 before transcription.
+
+    Args:
+        file_path: Path to the video/audio file on disk (owned by the caller)
+        filename: Original filename
+        on_chunk: Optional callback receiving each chunk's transcript as
+            it completes, so downstream stages can start before the full
+            transcription finishes (only fires on the chunked path)
+
+    Returns:
+        str: The transcribed text
     """
+    converted_path = None
+    compressed_path = None
+    extracted_path = None
+    chunk_dir = None
     try:
         # Check if conversion is needed
         if filename.lower().endswith('.mov'):
             st.info("🔄 Converting MOV to MP4 format...")
             try:
-                file_bytes = convert_mov_to_mp4(file_bytes, filename)
+                converted_path = convert_mov_to_mp4(file_path, filename)
+                file_path = converted_path
                 filename = filename.rsplit('.', 1)[0] + '.mp4'  # Change extension
                 st.success("✅ MOV conversion completed")
             except Exception as e:
@@ -280,44 +452,51 @@ def transcribe_video(file_bytes: bytes, filename: str) -> str:
                 
                 raise Exception(f"MOV conversion failed in live environment. Please convert to MP4 first or try the alternative solutions shown above.")
         
-        # Get OpenAI API key from environment
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
+        # The key is read at client construction; fail here with a clear
+        # message rather than deep inside the SDK
+        if not os.getenv('OPENAI_API_KEY'):
             raise ValueError("OpenAI API key not found. Please set OPENAI_API_KEY in your .env file.")
-        
-        # Set up OpenAI client (new v1.0+ API)
-        client = OpenAI(api_key=api_key)
-        
-        # Create a temporary file with the correct extension
-        file_extension = os.path.splitext(filename)[1].lower()
-        if not file_extension:
-            file_extension = '.mp4'  # Default extension
-            
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            temp_file.write(file_bytes)
-            temp_file_path = temp_file.name
-        
+
+        client = _get_client()
+
         try:
-            # Check file size (Whisper API has a 25MB limit)
-            file_size_mb = len(file_bytes) / (1024 * 1024)
-            
-            if file_size_mb > 25:
-                st.info(f"📦 File size ({file_size_mb:.1f}MB) exceeds Whisper API limit. Compressing...")
-                # Compress the file
-                compressed_path = compress_audio_for_whisper(temp_file_path)
-                transcription_file_path = compressed_path
+            # Long recordings are split and the chunks sent to Whisper in
+            # parallel, so wall time is roughly one chunk's latency plus
+            # the ffmpeg pass instead of the whole recording's
+            try:
+                duration = probe_duration(file_path)
+            except Exception:
+                duration = 0.0
+
+            if duration > _CHUNK_SECONDS:
+                chunk_paths = _split_audio(file_path)
+                chunk_dir = os.path.dirname(chunk_paths[0])
+                st.info(f"🎤 Transcribing {len(chunk_paths)} audio chunks in parallel...")
+                pieces = asyncio.run(_transcribe_chunks_async(chunk_paths, on_chunk))
+                transcript = "\n".join(piece.strip() for piece in pieces)
             else:
-                transcription_file_path = temp_file_path
-            
-            # Transcribe using the new API structure
-            st.info("🎤 Sending file to OpenAI Whisper...")
-            with open(transcription_file_path, 'rb') as audio_file:
-                transcript = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format="text"
-                )
-            
+                transcription_file_path = file_path
+
+                # Strip the video stream before uploading; Whisper only
+                # reads the audio track
+                if os.path.splitext(filename)[1].lower() not in _AUDIO_EXTENSIONS:
+                    st.info("🎬 Extracting audio track for upload...")
+                    extracted_path = _extract_audio(file_path)
+                    transcription_file_path = extracted_path
+
+                # Check file size (Whisper API has a 25MB limit)
+                file_size_mb = os.path.getsize(transcription_file_path) / (1024 * 1024)
+
+                if file_size_mb > 25:
+                    st.info(f"📦 File size ({file_size_mb:.1f}MB) exceeds Whisper API limit. Compressing...")
+                    # Compress the file
+                    compressed_path = compress_audio_for_whisper(transcription_file_path)
+                    transcription_file_path = compressed_path
+
+                # Transcribe using the new API structure
+                st.info("🎤 Sending file to OpenAI Whisper...")
+                transcript = _transcribe_chunk(client, transcription_file_path)
+
             # Validate that we got actual text back
             if not isinstance(transcript, str):
                 raise Exception("Invalid response from Whisper API - not a string")
@@ -335,59 +514,38 @@ def transcribe_video(file_bytes: bytes, filename: str) -> str:
             return transcript
             
         finally:
-            # Clean up the temporary files
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-            # Clean up compressed file if it was created
-            compressed_path = temp_file_path.replace('.mp4', '_compressed.mp3').replace('.mp3', '_compressed.mp3')
-            if os.path.exists(compressed_path):
-                os.unlink(compressed_path)
+            # Clean up files this function created; the caller owns file_path
+            for cleanup_path in (compressed_path, extracted_path, converted_path):
+                if cleanup_path and os.path.exists(cleanup_path):
+                    os.unlink(cleanup_path)
+            if chunk_dir:
+                shutil.rmtree(chunk_dir, ignore_errors=True)
                 
     except Exception as e:
         error_msg = f"Transcription failed: {str(e)}"
         st.error(error_msg)
         raise Exception(error_msg)
 
-def validate_file_duration(file_bytes: bytes, filename: str, max_duration_minutes: int = 30) -> tuple[bool, str]:
+def validate_file_duration(file_path: str, filename: str, max_duration_minutes: int = 30) -> tuple[bool, str]:
     """
     Validate if the audio/video file duration is within limits.
-    
+
     Args:
-        file_bytes: The file content as bytes
+        file_path: Path to the file on disk
         filename: Original filename
         max_duration_minutes: Maximum allowed duration in minutes
-        
+
     Returns:
         tuple: (is_valid, message)
     """
     try:
-        import ffmpeg
-        
-        # Create a temporary file
-        file_extension = os.path.splitext(filename)[1].lower()
-        if not file_extension:
-            file_extension = '.mp4'
-            
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            temp_file.write(file_bytes)
-            temp_file_path = temp_file.name
-        
-        try:
-            # Get file info using ffmpeg
-            probe = ffmpeg.probe(temp_file_path)
-            duration = float(probe['streams'][0]['duration'])
-            duration_minutes = duration / 60
-            
-            if duration_minutes > max_duration_minutes:
-                return False, f"File duration ({duration_minutes:.1f} minutes) exceeds the {max_duration_minutes} minute limit."
-            else:
-                return True, f"File duration: {duration_minutes:.1f} minutes"
-                
-        finally:
-            # Clean up
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-                
+        duration_minutes = probe_duration(file_path) / 60
+
+        if duration_minutes > max_duration_minutes:
+            return False, f"File duration ({duration_minutes:.1f} minutes) exceeds the {max_duration_minutes} minute limit."
+        else:
+            return True, f"File duration: {duration_minutes:.1f} minutes"
+
     except Exception as e:
         # If we can't check duration, just warn but allow processing
         return True, f"Could not validate duration: {str(e)}" 
\ No newline at end of file